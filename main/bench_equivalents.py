@@ -0,0 +1,255 @@
+"""Benchmarks of the Equivalents Calculator.
+
+Times the model conversions on synthetic libraries of 10^2 to 10^6 reagents, full reaction and campaign
+calculations, reading and saving the library, thumbnail generation over the images folder and the cold
+import. The results are written as JSON and compared with a stored baseline, by default the reference
+run in bench_baseline.json:
+
+    python bench_equivalents.py --save-baseline       # on the reference machine, before a change
+    python bench_equivalents.py                       # afterwards, exits with 1 on a regression
+
+On another machine, pass --baseline FILE to both runs, as the timings depend on the machine.
+
+Use --quick for libraries of up to 10^4 reagents only.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import importlib.util
+import shutil
+import platform
+import tempfile
+import statistics
+import subprocess
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+IMAGES_DIR = os.path.join(HERE, '..', 'images')
+DEFAULT_BASELINE = os.path.join(HERE, 'bench_baseline.json')
+SIZES = [10**2, 10**3, 10**4, 10**5, 10**6]
+QUICK_SIZES = [10**2, 10**3, 10**4]
+
+def synthetic_library(size: int, seed: int = 0) -> list:
+    """Returns `size` reagents of all four categories, in the library.json format."""
+
+    rng = random.Random(seed)
+    reagents = []
+    for i in range(size):
+        category = ('solid', 'liquid', 'percent solution', 'molar solution')[i % 4]
+        reagent = {'name': f'reagent {i}', 'category': category, 'molar mass': round(rng.uniform(15, 800), 2)}
+        if category == 'liquid':
+            reagent['density'] = round(rng.uniform(0.6, 2), 3)
+        elif category == 'percent solution':
+            reagent['solution concentration'] = rng.randint(5, 70)
+            reagent['solution density'] = round(rng.uniform(0.8, 1.8), 3)
+        elif category == 'molar solution':
+            reagent['solution concentration'] = rng.choice([0.5, 1, 2, 4])
+        reagent['image'] = ''
+        reagents.append(reagent)
+    return reagents
+
+def measure(function, repeat: int = 5) -> dict:
+    """Times a function like timeit: the best of `repeat` runs of an automatically chosen number of calls."""
+
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    times = [seconds/number for seconds in timer.repeat(repeat=repeat, number=number)]
+    return {'seconds': min(times), 'median': statistics.median(times), 'calls': number*repeat}
+
+def measure_once(function, repeat: int = 3) -> dict:
+    """Times functions that are too slow or change state too much for measure."""
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {'seconds': min(times), 'median': statistics.median(times), 'calls': repeat}
+
+def bench_model(results, sizes):
+    from core import CalculatorModel, ReagentRegistry
+
+    for size in sizes:
+        reagents = synthetic_library(size)
+        results[f'registry.build[{size}]'] = measure_once(lambda: ReagentRegistry(list(reagents)))
+        model = CalculatorModel(ReagentRegistry(reagents))
+        rng = random.Random(size)
+        names = [reagents[rng.randrange(size)]['name'] for _ in range(1000)]
+        results[f'model.to_mols[{size}]'] = measure(lambda: [model.to_mols(name, 1.5) for name in names])
+        results[f'model.from_mols[{size}]'] = measure(lambda: [model.from_mols(name, 0.01) for name in names])
+
+        model.registry.factor_columns()  # Build the columns outside of the timing
+        results[f'model.to_mols_batch[{size}]'] = measure(lambda: model.to_mols_batch(names, [1.5]*len(names)))
+        results[f'model.from_mols_batch[{size}]'] = measure(lambda: model.from_mols_batch(names, [0.01]*len(names)))
+
+def bench_calculations(results):
+    from core import CalculatorModel, ReagentRegistry
+    from planner import plan_campaign
+
+    reagents = synthetic_library(10**4)
+    model = CalculatorModel(ReagentRegistry(reagents))
+    rng = random.Random(1)
+    setups = [(reagents[rng.randrange(len(reagents))]['name'], rng.uniform(0.1, 5),
+               [(reagents[rng.randrange(len(reagents))]['name'], rng.uniform(0.5, 3)) for _ in range(4)]) for _ in range(10**4)]
+
+    results['model.calculate[5 reagents]'] = measure(lambda: model.calculate(*setups[0]))
+    results['model.calculate[10^4 reactions]'] = measure_once(lambda: [model.calculate(*setup) for setup in setups])
+    results['planner.plan_campaign[10^4 reactions]'] = measure_once(lambda: plan_campaign(setups, model))
+
+def bench_persistence(results, sizes):
+    from core import load_library
+    from store import ReagentStore
+    from table import ReagentTable, load_table
+
+    directory = tempfile.mkdtemp()
+    try:
+        for size in sizes:
+            path = os.path.join(directory, f'library-{size}.json')
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(synthetic_library(size), file, indent=2)
+
+            results[f'library.load[{size}]'] = measure_once(lambda: load_library(path))
+            results[f'library.snapshot[{size}]'] = measure_once(lambda: ReagentTable.from_reagents(ReagentStore(path).load()).save(path + '.snapshot'))
+            load_table(path)
+            results[f'library.load_table[{size}]'] = measure_once(lambda: load_table(path))
+
+            # The save path of add_reagent: one journal append per added reagent
+            store = ReagentStore(path, compact_size=1 << 40)
+            store.append({'name': 'first', 'category': 'solid', 'molar mass': 100, 'image': ''})
+            counter = iter(range(10**9))
+            results[f'add_reagent.save[{size}]'] = measure_once(
+                lambda: store.append({'name': f'added {next(counter)}', 'category': 'solid', 'molar mass': 100, 'image': ''}), repeat=10)
+            results[f'library.compact[{size}]'] = measure_once(store.compact)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def bench_images(results):
+    try:
+        from thumbnails import ThumbnailCache, resize_image
+    except ImportError:  # Pillow is not installed
+        return
+
+    image_paths = sorted(os.path.join(IMAGES_DIR, name) for name in os.listdir(IMAGES_DIR))
+    results['resize_image[images folder]'] = measure_once(lambda: [resize_image(path, 80) for path in image_paths])
+
+    directory = tempfile.mkdtemp()
+    try:
+        results['thumbnails.cold[images folder]'] = measure_once(
+            lambda: [ThumbnailCache(cache_dir=None).get(path, 80) for path in image_paths])
+        ThumbnailCache(cache_dir=directory).prewarm(image_paths, 80, limit=len(image_paths)).join()
+        results['thumbnails.disk[images folder]'] = measure_once(
+            lambda: [ThumbnailCache(cache_dir=directory).get(path, 80) for path in image_paths])
+        cache = ThumbnailCache(cache_dir=directory)
+        results['thumbnails.memory[images folder]'] = measure(lambda: [cache.get(path, 80) for path in image_paths])
+
+        # The part of display_image that needs Tk, if a display is available
+        try:
+            import tkinter as tk
+            from PIL import ImageTk
+        except ImportError:
+            return
+        try:
+            root = tk.Tk()
+        except tk.TclError:  # No display
+            return
+        try:
+            label = tk.Label(root)
+            thumbnails = [cache.get(path, 80) for path in image_paths]
+
+            def display():
+                for thumbnail in thumbnails:
+                    image = ImageTk.PhotoImage(thumbnail)
+                    label.config(image=image)
+                    label.image = image
+            results['display_image.photo[images folder]'] = measure(display)
+        finally:
+            root.destroy()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def bench_import(results):
+    """Times cold imports in fresh interpreters, relative to an interpreter that imports nothing."""
+
+    def run(code):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=HERE, check=True)
+        return time.perf_counter() - start
+
+    for module in ('equivalents', 'cli', 'gui'):
+        if module == 'gui' and not all(importlib.util.find_spec(name) for name in ('tkinter', 'PIL')):
+            continue
+        times = [run(f'import {module}') - run('pass') for _ in range(5)]
+        results[f'import[{module}]'] = {'seconds': min(times), 'median': statistics.median(times), 'calls': len(times)}
+
+def run_benchmarks(quick: bool = False, only: list = None) -> dict:
+    sizes = QUICK_SIZES if quick else SIZES
+    groups = {
+        'model': lambda results: bench_model(results, sizes),
+        'calculations': bench_calculations,
+        'persistence': lambda results: bench_persistence(results, sizes),
+        'images': bench_images,
+        'import': bench_import,
+    }
+    results = {}
+    for name, bench in groups.items():
+        if not only or name in only:
+            bench(results)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'quick': quick,
+        'results': results,
+    }
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """Returns (benchmark, baseline seconds, seconds, ratio) for each benchmark that is slower than the baseline by more than the tolerance."""
+
+    regressions = []
+    for name, result in report['results'].items():
+        reference = baseline.get('results', {}).get(name)
+        if reference and reference['seconds'] > 0:
+            ratio = result['seconds']/reference['seconds']
+            if ratio > tolerance:
+                regressions.append((name, reference['seconds'], result['seconds'], ratio))
+    return regressions
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run the benchmarks and compare them with a baseline.')
+    parser.add_argument('--quick', action='store_true', help='use libraries of up to 10^4 reagents')
+    parser.add_argument('--only', nargs='+', choices=['model', 'calculations', 'persistence', 'images', 'import'], help='run only these groups')
+    parser.add_argument('--output', help='write the results to this JSON file (default: stdout)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON file (default: bench_baseline.json)')
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=1.25, help='slowdown that counts as a regression (default: 1.25)')
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, HERE)
+    report = run_benchmarks(args.quick, args.only)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'No baseline at {args.baseline}, run with --save-baseline to store one.', file=sys.stderr)
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as file:
+        regressions = compare(report, json.load(file), args.tolerance)
+    for name, reference, seconds, ratio in regressions:
+        print(f'REGRESSION {name}: {reference:.3g} s -> {seconds:.3g} s ({ratio:.2f}x)', file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""Command-line interface of the Equivalents Calculator.
+
+Reads reaction setups from a CSV or JSONL file (or stdin) and writes the results row by row,
+so that files of any size are processed with constant memory. tkinter and Pillow are not imported.
+
+CSV setups have no header, one reaction per row:
+
+    limiting reagent,amount,reagent B,eq of B,reagent C,eq of C,...
+
+JSONL setups have one object per line:
+
+    {"limiting reagent": "caffeine", "amount": 1.5, "reagents": [["pyridine", 2], ["2M HCl", 1.1]]}
+
+Empty lines and CSV rows starting with '#' are skipped. With --jobs N, the setups are calculated by N
+processes (see parallel.py).
+"""
+
+import sys
+import csv
+import json
+import math
+import argparse
+import instrument
+from core import CalculatorModel, library_path, set_library_path
+
+def parse_number(value) -> float:
+    """Converts an amount or equivalents into a float. Raises ValueError for values that are not finite numbers."""
+
+    try:
+        number = float(value)
+    except OverflowError:
+        raise ValueError(f'Number out of range: {value}') from None
+    if not math.isfinite(number):
+        raise ValueError(f'Invalid number: {value}')
+    return number
+
+def parse_csv_row(row: list) -> tuple:
+    """Converts a CSV row into a (limiting reagent, amount, [(reagent, eq), ...]) setup."""
+
+    if len(row) < 2 or len(row) % 2:
+        raise ValueError('Expected the limiting reagent, its amount and (reagent, eq) pairs!')
+    cells = [cell.strip() for cell in row]
+    reagents = [(cells[i], parse_number(cells[i + 1])) for i in range(2, len(cells), 2)]
+    return cells[0], parse_number(cells[1]), reagents
+
+def parse_json_line(line: str) -> tuple:
+    """Converts a JSONL line into a (limiting reagent, amount, [(reagent, eq), ...]) setup."""
+    return parse_setup(json.loads(line))
+
+def parse_setup(setup: dict) -> tuple:
+    """Converts a JSON object into a (limiting reagent, amount, [(reagent, eq), ...]) setup."""
+
+    if not isinstance(setup, dict):
+        raise ValueError('Expected a JSON object!')
+    try:
+        reagents = [(str(name), parse_number(eqs)) for name, eqs in setup.get('reagents', [])]
+        return str(setup['limiting reagent']), parse_number(setup['amount']), reagents
+    except KeyError as error:
+        raise ValueError(f'Missing key: {error}') from None
+
+def read_records(file, input_format: str):
+    """Yields (line number, CSV row or JSONL line) for each reaction setup in the file, without parsing it."""
+
+    if input_format == 'csv':
+        reader = csv.reader(file)
+        for row in reader:
+            if not row or not ''.join(row).strip() or row[0].lstrip().startswith('#'):
+                continue
+            yield reader.line_num, row
+    else:
+        for line_num, line in enumerate(file, start=1):
+            if line.strip():
+                yield line_num, line
+
+def parse_records(records, input_format: str):
+    """Yields (line number, setup or None, error message or None) for each record from read_records."""
+
+    parse = parse_csv_row if input_format == 'csv' else parse_json_line
+    for line_num, record in records:
+        try:
+            yield line_num, parse(record), None
+        except (ValueError, TypeError) as error:
+            yield line_num, None, str(error)
+        except (OverflowError, RecursionError):  # Numbers out of range or JSON nested too deeply
+            yield line_num, None, 'Invalid record!'
+
+def read_setups(file, input_format: str):
+    """Yields (line number, setup or None, error message or None) for each reaction setup in the file."""
+    return parse_records(read_records(file, input_format), input_format)
+
+def calculate_setup(model: CalculatorModel, setup: tuple) -> list:
+    """Calculates a setup. Raises KeyError for unknown reagents and ValueError for incomplete library entries or results out of range."""
+
+    name_of_A, amount_of_A, reagents = setup
+    results = model.calculate(name_of_A, amount_of_A, reagents)
+    if not math.isfinite(model.to_mols(name_of_A, amount_of_A)) or not all(math.isfinite(amount) for _, _, amount, _ in results):
+        raise ValueError('Result out of range!')
+    return results
+
+def calculate_setups(setups, model: CalculatorModel):
+    """Yields (line number, setup, results or None, error message or None) for each reaction setup."""
+
+    for line_num, setup, error in setups:
+        if error is None:
+            try:
+                yield line_num, setup, calculate_setup(model, setup), None
+                continue
+            except KeyError as key_error:
+                error = key_error.args[0]
+            except ValueError as value_error:
+                error = str(value_error)
+        yield line_num, setup, None, error
+
+def format_result(model: CalculatorModel, setup: tuple, results: list, error: str) -> dict:
+    """Converts the results of a reaction setup (or the error message) into a JSON object."""
+
+    if error is not None:
+        return {'error': error}
+    name_of_A, amount_of_A, _ = setup
+    return {
+        'limiting reagent': name_of_A,
+        'amount': amount_of_A,
+        'unit': model.registry.unit(name_of_A),
+        'mol': model.to_mols(name_of_A, amount_of_A),
+        'reagents': [{'name': name, 'eq': eqs, 'amount': amount, 'unit': unit} for name, eqs, amount, unit in results],
+    }
+
+class JSONLWriter:
+    def __init__(self, file, model):
+        self.file = file
+        self.model = model
+
+    def write(self, line_num, setup, results, error):
+        row = {'line': line_num, **format_result(self.model, setup, results, error)}
+        self.file.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+class CSVWriter:
+    def __init__(self, file, model):
+        self.model = model
+        self.writer = csv.writer(file, lineterminator='\n')
+
+    @staticmethod
+    def write_header(file):
+        csv.writer(file, lineterminator='\n').writerow(['line', 'reagent', 'eq', 'amount', 'unit', 'error'])
+
+    def write(self, line_num, setup, results, error):
+        if error is not None:
+            self.writer.writerow([line_num, '', '', '', '', error])
+            return
+        name_of_A, amount_of_A, _ = setup
+        self.writer.writerow([line_num, name_of_A, 1.0, amount_of_A, self.model.registry.unit(name_of_A), ''])
+        for name, eqs, amount, unit in results:
+            self.writer.writerow([line_num, name, eqs, amount, unit, ''])
+
+WRITERS = {'jsonl': JSONLWriter, 'csv': CSVWriter}
+
+def detect_format(file, path: str) -> str:
+    """Guesses the input format from the file extension, or from the first character of stdin."""
+
+    if path.endswith('.jsonl') or path.endswith('.json'):
+        return 'jsonl'
+    if path.endswith('.csv') or path != '-':
+        return 'csv'
+    buffer = getattr(file, 'buffer', None)
+    if buffer is not None and hasattr(buffer, 'peek'):
+        return 'jsonl' if buffer.peek(1)[:1] == b'{' else 'csv'
+    return 'csv'
+
+def parse_jobs(value: str) -> int:
+    """Converts the --jobs option into a number of processes (0 for all CPUs). Raises ArgumentTypeError for negative numbers."""
+
+    jobs = int(value)
+    if jobs < 0:
+        raise argparse.ArgumentTypeError(f'expected 0 or more processes, got {value}')
+    return jobs
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Calculate reagent amounts for reaction setups read from a CSV or JSONL file.')
+    parser.add_argument('input', nargs='?', default='-', help='file with reaction setups (default: stdin)')
+    parser.add_argument('--format', choices=['auto', 'csv', 'jsonl'], default='auto', help='input format (default: from the file extension)')
+    parser.add_argument('--output', choices=list(WRITERS), default='jsonl', help='output format (default: jsonl)')
+    parser.add_argument('--library', help='path of the reagent library (default: library.json next to this file)')
+    parser.add_argument('--jobs', type=parse_jobs, default=1, help='number of processes to calculate with, 0 for all CPUs (default: 1)')
+    parser.add_argument('--profile', nargs='?', const='', metavar='FILE', help='time model calls and write the statistics to FILE (default: stderr) on exit')
+    args = parser.parse_args(argv)
+    if args.profile is not None:
+        instrument.enable(args.profile or None)
+    if args.library:
+        set_library_path(args.library)
+
+    from table import load_table
+
+    # The library is only read here, so the memory-mapped snapshot of it is used
+    model = CalculatorModel(load_table(library_path()))
+    file = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8', newline='')
+    failed = False
+
+    try:
+        input_format = detect_format(file, args.input) if args.format == 'auto' else args.format
+        if args.jobs != 1:
+            from parallel import calculate_file
+            failed = calculate_file(file, input_format, sys.stdout, args.output, model.registry, args.jobs)
+        else:
+            if args.output == 'csv':
+                CSVWriter.write_header(sys.stdout)
+            writer = WRITERS[args.output](sys.stdout, model)
+            for row in calculate_setups(read_setups(file, input_format), model):
+                failed = failed or row[3] is not None
+                writer.write(*row)
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
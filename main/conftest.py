@@ -0,0 +1,47 @@
+import os
+import json
+import shutil
+import pytest
+from core import DEFAULT_LIBRARY_PATH, CalculatorModel, load_library, set_library_path
+
+@pytest.fixture(scope='session', autouse=True)
+def library(tmp_path_factory):
+    """A copy of the shipped library, used as the default library so that no lock or snapshot file is written next to the original."""
+
+    path = str(tmp_path_factory.mktemp('library') / 'library.json')
+    shutil.copyfile(DEFAULT_LIBRARY_PATH, path)
+    set_library_path(path)
+    yield path
+    set_library_path(DEFAULT_LIBRARY_PATH)
+
+@pytest.fixture(scope='session')
+def model(library):
+    return CalculatorModel(load_library(library))
+
+@pytest.fixture
+def caffeine():
+    return {'name': 'caffeine', 'category': 'solid', 'molar mass': 194.19}
+
+@pytest.fixture
+def acetone():
+    return {'name': 'acetone', 'category': 'liquid', 'molar mass': 58.08, 'density': 0.79}
+
+@pytest.fixture
+def pyridine():
+    return {'name': 'pyridine', 'category': 'liquid', 'molar mass': 79.1, 'density': 0.98}
+
+@pytest.fixture
+def write_library():
+    """Returns a function that writes reagents to a library file and returns its path.
+
+    Each write gets a distinct modification time, so that the library watcher sees every change.
+    """
+
+    def write(path, reagents) -> str:
+        path = str(path)
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(reagents, file, indent=2)
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10**9))
+        return path
+
+    return write
@@ -0,0 +1,558 @@
+"""Calculation core of the Equivalents Calculator, usable without tkinter or Pillow."""
+
+import os
+import sys
+import threading
+import instrument
+from typing import TYPE_CHECKING
+from store import ReagentStore
+
+# NumPy is only needed for the batch conversions and is imported on first use to keep the import of this module fast
+np = None
+if TYPE_CHECKING:
+    import numpy as np
+
+DEFAULT_LIBRARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'library.json')
+
+# Reagent categories, in the order of their codes in the registry columns
+CATEGORIES = ('solid', 'liquid', 'percent solution', 'molar solution')
+
+def normalize_name(name: str) -> str:
+    """Returns the key under which a reagent name is indexed (case and surrounding/repeated whitespace are ignored)."""
+    return ' '.join(name.split()).casefold()
+
+def conversion_factors(reagent: dict) -> tuple:
+    """Calculates the conversion factors for a reagent.
+
+    Parameters
+    ----------
+    reagent : dict
+        The reagent entry from library.json.
+
+    Returns
+    -------
+    tuple
+        Moles per unit (mol/g for solids or mol/mL for liquids and solutions) and units per mole,
+        or (None, None) if the entry is incomplete or has an unknown category.
+    """
+
+    try:
+        category = reagent['category']
+        if category == 'solid':
+            return 1/reagent['molar mass'], reagent['molar mass']
+        elif category == 'liquid':
+            return reagent['density']/reagent['molar mass'], reagent['molar mass']/reagent['density']
+        elif category == 'percent solution':
+            return (reagent['solution concentration']*reagent['solution density']/(100*reagent['molar mass']),
+                    reagent['molar mass']*100/(reagent['solution density']*reagent['solution concentration']))
+        elif category == 'molar solution':
+            return reagent['solution concentration']/1000, 1000/reagent['solution concentration']
+    except (KeyError, TypeError, ZeroDivisionError):
+        pass
+    return None, None
+
+def conversion_factor_columns(columns: dict) -> tuple:
+    """Calculates the conversion factors for whole columns of reagent properties at once.
+
+    Parameters
+    ----------
+    columns : dict
+        NumPy columns of the categories (positions in CATEGORIES) and properties, as returned by
+        ReagentRegistry.columns.
+
+    Returns
+    -------
+    tuple
+        Columns of the moles per unit and units per mole, calculated per category as in
+        conversion_factors, with NaN for incomplete entries and unknown categories.
+    """
+
+    _import_numpy()
+    category = columns['category']
+    molar_mass = columns['molar mass']
+    density = columns['density']
+    concentration = columns['solution concentration']
+    solution_density = columns['solution density']
+    conditions = [category == code for code in range(len(CATEGORIES))]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mols_per_unit = np.select(conditions, [
+            1/molar_mass,
+            density/molar_mass,
+            concentration*solution_density/(100*molar_mass),
+            concentration/1000,
+        ], default=np.nan)
+        units_per_mol = np.select(conditions, [
+            molar_mass,
+            molar_mass/density,
+            molar_mass*100/(solution_density*concentration),
+            1000/concentration,
+        ], default=np.nan)
+
+    # Division by zero marks an incomplete entry, as in conversion_factors
+    mols_per_unit[~np.isfinite(mols_per_unit)] = np.nan
+    units_per_mol[~np.isfinite(units_per_mol)] = np.nan
+    return mols_per_unit, units_per_mol
+
+def lookup_positions(names, index, count: int, missing: int = None) -> 'np.ndarray':
+    """Returns the positions for an array of reagent names or indices, see ReagentRegistry.positions.
+
+    `index` returns the position of a name or None, and `count` is the number of reagents.
+    """
+
+    _import_numpy()
+    names = np.asarray(names)
+    if names.dtype.kind in 'iu':
+        if names.size and (names.min() < 0 or names.max() >= count):
+            raise IndexError('Registry index out of range!')
+        return names.astype(np.intp, copy=False)
+
+    # Each distinct name is looked up only once
+    unique_names, inverse = np.unique(names, return_inverse=True)
+    unique_positions = np.empty(len(unique_names), dtype=np.intp)
+    for i, name in enumerate(unique_names):
+        position = index(str(name))
+        if position is None:
+            if missing is None:
+                raise KeyError(f'Unknown reagent: {name}')
+            position = missing
+        unique_positions[i] = position
+    return unique_positions[inverse].reshape(names.shape)
+
+class ReagentRegistry:
+    """Reagents from the library indexed by normalized name, with precomputed conversion factors.
+
+    The registry keeps a reference to the list it was created from, so reagents added through
+    `add` are visible in that list as well.
+    """
+
+    def __init__(self, reagents: list = None):
+        self.reagents = reagents if reagents is not None else []
+        self._index = {}
+        self._mols_per_unit = []
+        self._units_per_mol = []
+        self._columns = None
+        self._factor_columns = None
+
+        # Incremented whenever entries are replaced or removed, i.e. when more than an append happened
+        self.generation = 0
+
+        for position, reagent in enumerate(self.reagents):
+            self._index_reagent(position, reagent)
+
+    def _index_reagent(self, position, reagent):
+        # The first entry wins for duplicate names, as with the former linear search
+        self._index.setdefault(normalize_name(reagent['name']), position)
+        mols_per_unit, units_per_mol = conversion_factors(reagent)
+        self._mols_per_unit.append(mols_per_unit)
+        self._units_per_mol.append(units_per_mol)
+
+    def __len__(self):
+        return len(self.reagents)
+
+    def __iter__(self):
+        return iter(self.reagents)
+
+    def __contains__(self, name):
+        return normalize_name(name) in self._index
+
+    def add(self, reagent: dict) -> int:
+        """Appends a reagent and indexes it. Returns its position in the registry."""
+        position = len(self.reagents)
+        self.reagents.append(reagent)
+        self._index_reagent(position, reagent)
+        self._columns = None
+        self._factor_columns = None
+        return position
+
+    def _replace(self, position, reagent):
+        self.reagents[position] = reagent
+        self._mols_per_unit[position], self._units_per_mol[position] = conversion_factors(reagent)
+        self._columns = None
+        self._factor_columns = None
+        self.generation += 1
+
+    def _keep(self, positions):
+        self.reagents[:] = [self.reagents[position] for position in positions]
+        self._mols_per_unit = [self._mols_per_unit[position] for position in positions]
+        self._units_per_mol = [self._units_per_mol[position] for position in positions]
+        self._index = {normalize_name(reagent['name']): position for position, reagent in enumerate(self.reagents)}
+        self._columns = None
+        self._factor_columns = None
+        self.generation += 1
+
+    def merge(self, reagents: list, partial: bool = False) -> tuple:
+        """Brings the registry in line with a new version of the library, touching only the entries that differ.
+
+        Parameters
+        ----------
+        reagents : list
+            The reagent entries of the new version of the library.
+
+        partial : bool
+            If True, the entries are only added (e.g. the end of a journal): no reagent is removed, and entries
+            whose names are already in the registry are skipped, as the first entry of a name wins when the
+            library is read.
+
+        Returns
+        -------
+        tuple
+            Lists of the names of the added, changed and removed reagents.
+        """
+
+        latest = {}
+        for reagent in reagents:
+            latest.setdefault(normalize_name(reagent['name']), reagent)
+
+        changed, removed = [], []
+        if not partial:
+            for key, position in self._index.items():
+                reagent = latest.get(key)
+                if reagent is None:
+                    removed.append(self.reagents[position]['name'])
+                elif self.reagents[position] != reagent:
+                    self._replace(position, reagent)
+                    changed.append(reagent['name'])
+
+            # Drop the removed reagents and any duplicates of names that the new version lists once
+            if removed or len(self._index) != len(self.reagents):
+                self._keep(sorted(position for key, position in self._index.items() if key in latest))
+
+        added = []
+        for key, reagent in latest.items():
+            if key not in self._index:
+                self.add(reagent)
+                added.append(reagent['name'])
+        return added, changed, removed
+
+    def index(self, name: str):
+        """Returns the position of the reagent in the registry or None if it is unknown."""
+        return self._index.get(normalize_name(name))
+
+    def get(self, name: str):
+        """Returns the reagent entry or None if it is unknown."""
+        position = self.index(name)
+        return None if position is None else self.reagents[position]
+
+    def positions(self, names, missing: int = None) -> 'np.ndarray':
+        """Returns the registry positions for an array of reagent names or registry indices.
+
+        Unknown names get the position `missing` if it is given, otherwise they raise KeyError.
+        Indices out of range raise IndexError.
+        """
+
+        return lookup_positions(names, self.index, len(self.reagents), missing)
+
+    def columns(self) -> dict:
+        """Returns the reagent properties as NumPy columns (NaN where a property is missing).
+
+        The 'category' column holds the position of the category in CATEGORIES, or -1 if it is unknown.
+        """
+
+        if self._columns is None:
+            _import_numpy()
+
+            def column(key):
+                # Missing and non-numeric values, which conversion_factors rejects as well, become NaN
+                values = (reagent.get(key) for reagent in self.reagents)
+                return np.array([value if type(value) in (int, float) else np.nan for value in values], dtype=float)
+
+            self._columns = {
+                'category': np.array([CATEGORIES.index(reagent['category']) if reagent.get('category') in CATEGORIES else -1
+                                      for reagent in self.reagents], dtype=np.int8),
+                'molar mass': column('molar mass'),
+                'density': column('density'),
+                'solution concentration': column('solution concentration'),
+                'solution density': column('solution density'),
+            }
+        return self._columns
+
+    def factor_columns(self) -> tuple:
+        """Returns the moles per unit and units per mole of all reagents as NumPy columns (NaN for incomplete entries)."""
+
+        if self._factor_columns is None:
+            self._factor_columns = conversion_factor_columns(self.columns())
+        return self._factor_columns
+
+    def names(self) -> list:
+        return [reagent['name'] for reagent in self.reagents]
+
+    def unit(self, name: str):
+        """Returns the unit the reagent is measured in ('g' for solids, 'mL' otherwise) or None if it is unknown."""
+        reagent = self.get(name)
+        if reagent is None:
+            return None
+        return 'g' if reagent['category'] == 'solid' else 'mL'
+
+    def mols_per_unit(self, name: str):
+        position = self.index(name)
+        return None if position is None else self._mols_per_unit[position]
+
+    def units_per_mol(self, name: str):
+        position = self.index(name)
+        return None if position is None else self._units_per_mol[position]
+
+def _import_numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+
+def load_library(path: str = None) -> ReagentRegistry:
+    """Reads a library (library.json next to this module by default) and its journal into a new registry."""
+
+    return ReagentRegistry(ReagentStore(path or DEFAULT_LIBRARY_PATH).load())
+
+# The library is read on first use, not when this module is imported
+_library_path = DEFAULT_LIBRARY_PATH
+_registry = None
+_registry_lock = threading.Lock()
+
+def library_path() -> str:
+    """Returns the path of the library used by default."""
+    return _library_path
+
+def set_library_path(path: str):
+    """Selects the library used by default. It is read on the next call of get_registry."""
+
+    global _library_path, _registry
+    _library_path = os.path.abspath(path)
+    _registry = None
+
+def get_registry() -> ReagentRegistry:
+    """Returns the registry of the default library, reading the library file on the first call.
+
+    The library is read only once if several threads call this at the same time (e.g. the app reads it
+    in the background while the window is shown).
+    """
+
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = load_library(_library_path)
+        return _registry
+
+class CalculatorModel:
+    def __init__(self, registry: ReagentRegistry = None):
+        self._registry = registry
+
+    @property
+    def registry(self) -> ReagentRegistry:
+        """The registry used for the calculations (the default library unless one was passed in)."""
+
+        if self._registry is None:
+            return get_registry()
+        return self._registry
+
+    def to_mols(self, name: str, init_amount: float) -> float:
+        """Calculates the number of moles for a reagent.
+        
+        Parameters
+        ----------
+        name : str
+            The name of the reagent.
+
+        init_amount : float
+            The initial amount of the reagent (mL for liquids and solutions or g for solids).
+        
+        Returns
+        -------
+        float	
+            Number of moles of the chemical substance (mol).
+        """
+
+        factor = self.registry.mols_per_unit(name)
+        if factor is None:
+            return None
+        return init_amount*factor
+    
+    def from_mols(self, name: str, init_amount: float) -> float:
+        """Calculates the mass or volume of a reagent.
+        
+        Parameters
+        ----------
+        name : str
+            The name of the reagent.
+
+        init_amount : float
+            The initial number of moles of the chemical substance (mol).
+        
+        Returns
+        -------
+        float	
+            Necessary mass (g) or volume (mL) of the reagent.
+        """
+
+        factor = self.registry.units_per_mol(name)
+        if factor is None:
+            return None
+        return init_amount*factor
+
+    def to_mols_batch(self, names, init_amounts) -> 'np.ndarray':
+        """Calculates the number of moles for many reagents at once.
+        
+        Parameters
+        ----------
+        names : array_like
+            Reagent names or registry indices.
+
+        init_amounts : array_like
+            The initial amounts of the reagents (mL for liquids and solutions or g for solids).
+        
+        Returns
+        -------
+        numpy.ndarray
+            Number of moles of each chemical substance (mol), NaN for incomplete library entries.
+
+        Raises
+        ------
+        ValueError
+            If the number of amounts differs from the number of reagents.
+        """
+
+        _import_numpy()
+        mols_per_unit, _ = self.registry.factor_columns()
+        return self._convert_batch(mols_per_unit, names, init_amounts)
+
+    def from_mols_batch(self, names, init_amounts) -> 'np.ndarray':
+        """Calculates the mass or volume for many reagents at once.
+        
+        Parameters
+        ----------
+        names : array_like
+            Reagent names or registry indices.
+
+        init_amounts : array_like
+            The initial numbers of moles of the chemical substances (mol).
+        
+        Returns
+        -------
+        numpy.ndarray
+            Necessary mass (g) or volume (mL) of each reagent, NaN for incomplete library entries.
+
+        Raises
+        ------
+        ValueError
+            If the number of amounts differs from the number of reagents.
+        """
+
+        _import_numpy()
+        _, units_per_mol = self.registry.factor_columns()
+        return self._convert_batch(units_per_mol, names, init_amounts)
+
+    def _convert_batch(self, factors, names, init_amounts) -> 'np.ndarray':
+        positions = self.registry.positions(names)
+        amounts = np.asarray(init_amounts, dtype=float)
+        if amounts.shape != positions.shape:
+            raise ValueError(f'Expected one amount per reagent, got {amounts.size} amounts for {positions.size} reagents!')
+        with np.errstate(over='ignore'):  # Results out of range become infinity
+            return amounts*factors[positions]
+
+    def _conversion_error(self, name: str) -> Exception:
+        """Returns the error for a reagent that cannot be converted: KeyError if it is unknown, ValueError if its entry is incomplete."""
+
+        if self.registry.index(name) is None:
+            return KeyError(f'Unknown reagent: {name}')
+        return ValueError('Incomplete library entry')
+
+    def calculate(self, name_of_A: str, init_amount_of_A: float, reagents) -> list:
+        """Calculates how much of each reagent needs to be measured for a reaction.
+
+        Parameters
+        ----------
+        name_of_A : str
+            The name of the limiting reagent.
+
+        init_amount_of_A : float
+            The initial amount of the limiting reagent (mL for liquids and solutions or g for solids).
+
+        reagents : iterable
+            (name, equivalents) pairs of the other reagents.
+
+        Returns
+        -------
+        list
+            (name, equivalents, amount, unit) tuples with the necessary mass (g) or volume (mL) of each reagent.
+
+        Raises
+        ------
+        KeyError
+            If a reagent is not in the library.
+
+        ValueError
+            If the library entry of a reagent is incomplete.
+        """
+
+        num_of_moles_of_A = self.to_mols(name_of_A, init_amount_of_A)
+        if num_of_moles_of_A is None:
+            raise self._conversion_error(name_of_A)
+
+        results = []
+        for name, eqs in reagents:
+            amount = self.from_mols(name, num_of_moles_of_A*eqs)
+            if amount is None:
+                raise self._conversion_error(name)
+            results.append((name, eqs, amount, self.registry.unit(name)))
+        return results
+
+    def max_scale(self, name_of_A: str, reagents, stock: dict) -> tuple:
+        """Calculates the largest amount of the limiting reagent that the reagents on hand suffice for.
+
+        Parameters
+        ----------
+        name_of_A : str
+            The name of the limiting reagent.
+
+        reagents : iterable
+            (name, equivalents) pairs of the other reagents.
+
+        stock : dict
+            The amount on hand of each reagent (mL for liquids and solutions or g for solids). Reagents
+            missing from it are not on hand.
+
+        Returns
+        -------
+        tuple
+            The largest amount of the limiting reagent (g or mL), its unit, and the name of the reagent
+            that runs out first (the limiting reagent itself if its own stock is the limit).
+
+        Raises
+        ------
+        KeyError
+            If a reagent is not in the library.
+
+        ValueError
+            If the equivalents of a reagent are not positive, the library entry of a reagent is incomplete
+            or an amount on hand is negative.
+        """
+
+        for name, amount in stock.items():
+            if not amount >= 0:
+                raise ValueError(f'Invalid amount of {name} on hand: {amount}')
+        on_hand = {self.registry.index(name): amount for name, amount in stock.items()}
+        on_hand.pop(None, None)
+
+        # A reagent listed more than once, or also as A, is needed for all of its equivalents together
+        if self.registry.index(name_of_A) is None:
+            raise KeyError(f'Unknown reagent: {name_of_A}')
+        needed = {self.registry.index(name_of_A): [name_of_A, 1]}
+        for name, eqs in reagents:
+            if not eqs > 0:
+                raise ValueError(f'Invalid equivalents of {name}: {eqs}')
+            index = self.registry.index(name)
+            if index is None:
+                raise KeyError(f'Unknown reagent: {name}')
+            needed.setdefault(index, [name, 0])[1] += eqs
+
+        num_of_moles_of_A, binding_reagent = None, None
+        for index, (name, eqs) in needed.items():
+            num_of_moles = self.to_mols(name, on_hand.get(index, 0))
+            if num_of_moles is None:
+                raise self._conversion_error(name)
+            num_of_moles /= eqs
+            if num_of_moles_of_A is None or num_of_moles < num_of_moles_of_A:
+                num_of_moles_of_A, binding_reagent = num_of_moles, name
+        return self.from_mols(name_of_A, num_of_moles_of_A), self.registry.unit(name_of_A), binding_reagent
+
+instrument.register(sys.modules[__name__], 'load_library')
+instrument.register(CalculatorModel, 'to_mols', 'from_mols', 'to_mols_batch', 'from_mols_batch', 'calculate', 'max_scale')
@@ -0,0 +1,124 @@
+"""Molar masses from molecular formulas.
+
+Formulas may contain parentheses or brackets with counts, group abbreviations (e.g. OAc, NMe2, Boc),
+Unicode subscripts, and several components joined by "·", "•", "*" or "." with an optional
+coefficient each, as in hydrates and salts:
+
+    >>> round(molar_mass('C8H10N4O2·H2O'), 2)
+    212.21
+    >>> round(molar_mass('NaBH(OAc)3'), 2)
+    211.94
+
+Each component is parsed once and cached, so the water of a thousand hydrates is only parsed once.
+"""
+
+import re
+from functools import lru_cache
+
+# Standard atomic weights (g/mol), conventional values for elements with an interval; the mass number of the most stable isotope for elements without a stable one
+ATOMIC_WEIGHTS = {
+    'H': 1.008, 'D': 2.014, 'He': 4.0026, 'Li': 6.94, 'Be': 9.0122, 'B': 10.81, 'C': 12.011, 'N': 14.007, 'O': 15.999,
+    'F': 18.998, 'Ne': 20.180, 'Na': 22.990, 'Mg': 24.305, 'Al': 26.982, 'Si': 28.085, 'P': 30.974, 'S': 32.06,
+    'Cl': 35.45, 'Ar': 39.95, 'K': 39.098, 'Ca': 40.078, 'Sc': 44.956, 'Ti': 47.867, 'V': 50.942, 'Cr': 51.996,
+    'Mn': 54.938, 'Fe': 55.845, 'Co': 58.933, 'Ni': 58.693, 'Cu': 63.546, 'Zn': 65.38, 'Ga': 69.723, 'Ge': 72.630,
+    'As': 74.922, 'Se': 78.971, 'Br': 79.904, 'Kr': 83.798, 'Rb': 85.468, 'Sr': 87.62, 'Y': 88.906, 'Zr': 91.224,
+    'Nb': 92.906, 'Mo': 95.95, 'Tc': 98, 'Ru': 101.07, 'Rh': 102.91, 'Pd': 106.42, 'Ag': 107.87, 'Cd': 112.41,
+    'In': 114.82, 'Sn': 118.71, 'Sb': 121.76, 'Te': 127.60, 'I': 126.90, 'Xe': 131.29, 'Cs': 132.91, 'Ba': 137.33,
+    'La': 138.91, 'Ce': 140.12, 'Pr': 140.91, 'Nd': 144.24, 'Pm': 145, 'Sm': 150.36, 'Eu': 151.96, 'Gd': 157.25,
+    'Tb': 158.93, 'Dy': 162.50, 'Ho': 164.93, 'Er': 167.26, 'Tm': 168.93, 'Yb': 173.05, 'Lu': 174.97, 'Hf': 178.49,
+    'Ta': 180.95, 'W': 183.84, 'Re': 186.21, 'Os': 190.23, 'Ir': 192.22, 'Pt': 195.08, 'Au': 196.97, 'Hg': 200.59,
+    'Tl': 204.38, 'Pb': 207.2, 'Bi': 208.98, 'Po': 209, 'At': 210, 'Rn': 222, 'Fr': 223, 'Ra': 226, 'Ac': 227,
+    'Th': 232.04, 'Pa': 231.04, 'U': 238.03, 'Np': 237, 'Pu': 244,
+}
+
+# Group abbreviations and their formulas. Ac means acetyl (not actinium) and Ts tosyl (not tennessine);
+# Pr is praseodymium, propyl has to be written nPr or iPr.
+GROUPS = {
+    'Me': 'CH3', 'Et': 'C2H5', 'nPr': 'C3H7', 'iPr': 'C3H7', 'Bu': 'C4H9', 'nBu': 'C4H9', 'iBu': 'C4H9',
+    'sBu': 'C4H9', 'tBu': 'C4H9', 'Ph': 'C6H5', 'Bn': 'C7H7', 'Cy': 'C6H11', 'Ac': 'C2H3O', 'Bz': 'C7H5O',
+    'Boc': 'C5H9O2', 'Cbz': 'C8H7O2', 'Fmoc': 'C15H11O2', 'Ts': 'C7H7SO2', 'Ms': 'CH3SO2', 'Tf': 'CF3SO2',
+    'TMS': 'C3H9Si', 'TBS': 'C6H15Si', 'Cp': 'C5H5', 'acac': 'C5H7O2', 'dba': 'C17H14O', 'OTf': 'CF3SO3',
+}
+
+# Separators between the components of hydrates, solvates and salts. A "." also separates components,
+# except in a decimal coefficient at the start of a component (e.g. "CaSO4·0.5H2O").
+SEPARATORS = '·•∙⋅*'
+
+SUBSCRIPTS = str.maketrans('₀₁₂₃₄₅₆₇₈₉', '0123456789')
+
+_TOKEN = re.compile(r'\s*(?:({groups})|([A-Z][a-z]?)|([(\[])|([)\]])|(\d+))'.format(
+    groups='|'.join(sorted(map(re.escape, GROUPS), key=len, reverse=True))))
+_COMPONENT = re.compile(r'\s*(\d+(?:\.\d+)?)?\s*(.*?)\s*$', re.DOTALL)
+_DECIMAL = re.compile(r'\s*\d+\.\d+')
+
+def _add(composition: dict, counts: dict, factor: float = 1):
+    for element, count in counts.items():
+        composition[element] = composition.get(element, 0) + count*factor
+
+@lru_cache(maxsize=4096)
+def _parse_component(text: str) -> tuple:
+    """Parses a formula without separators into sorted (element, count) pairs."""
+
+    stack = [{}]
+    position = 0
+    last = None  # Composition of the last element, group or closed parenthesis, to which a count applies
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None or match.end() == position:
+            raise ValueError(f'Invalid formula: {text!r} (at "{text[position:]}")')
+        group, element, opening, closing, count = match.groups()
+        position = match.end()
+
+        if count is not None:
+            if last is None:
+                raise ValueError(f'Invalid formula: {text!r} (count without an element)')
+            _add(stack[-1], last, int(count) - 1)
+            last = None
+        elif opening:
+            stack.append({})
+            last = None
+        elif closing:
+            if len(stack) == 1:
+                raise ValueError(f'Invalid formula: {text!r} (unbalanced parentheses)')
+            last = stack.pop()
+            _add(stack[-1], last)
+        else:
+            if group is not None:
+                last = dict(_parse_component(GROUPS[group]))
+            elif element in ATOMIC_WEIGHTS:
+                last = {element: 1}
+            else:
+                raise ValueError(f'Invalid formula: {text!r} (unknown element {element})')
+            _add(stack[-1], last)
+
+    if len(stack) != 1:
+        raise ValueError(f'Invalid formula: {text!r} (unbalanced parentheses)')
+    if not stack[0]:
+        raise ValueError(f'Invalid formula: {text!r}')
+    return tuple(sorted(stack[0].items()))
+
+def composition(formula: str) -> dict:
+    """Returns the number of atoms of each element in a formula.
+
+    Raises ValueError if the formula cannot be parsed.
+    """
+
+    result = {}
+    for part in re.split(f'[{SEPARATORS}]', formula.translate(SUBSCRIPTS)):
+        decimal = _DECIMAL.match(part)
+        start = decimal.end() if decimal else 0
+        components = part[start:].split('.')
+        components[0] = part[:start] + components[0]
+        for component in components:
+            coefficient, component = _COMPONENT.match(component).groups()
+            _add(result, dict(_parse_component(component)), float(coefficient) if coefficient else 1)
+    return {element: int(count) if float(count).is_integer() else count for element, count in result.items()}
+
+@lru_cache(maxsize=65536)
+def molar_mass(formula: str) -> float:
+    """Returns the molar mass (g/mol) of a formula.
+
+    Raises ValueError if the formula cannot be parsed.
+    """
+
+    return sum(ATOMIC_WEIGHTS[element]*count for element, count in composition(formula).items())
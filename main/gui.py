@@ -0,0 +1,653 @@
+import os
+import math
+import threading
+from PIL import ImageTk
+import tkinter as tk
+import instrument
+from tkinter.messagebox import showinfo, showwarning
+from tkinter.filedialog import askopenfilename
+from tkinter import ttk
+from core import CATEGORIES, CalculatorModel, get_registry, library_path
+from formula import molar_mass
+from store import ReagentStore
+from thumbnails import ThumbnailCache, resize_image
+from search import ReagentSearchIndex
+from tasks import TaskRunner
+from watcher import MALFORMED_ERRORS, LibraryWatcher
+
+IMAGES_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'images'))
+THUMBNAIL_HEIGHT = 80
+LIBRARY_POLL_INTERVAL = 2000  # ms
+SEARCH_LIMIT = 50  # Reagents listed in a combobox dropdown
+RECALCULATION_DELAY = 150  # ms after the last keystroke
+REAGENT_LABELS = ['A (limiting reagent)', 'B', 'C', 'D', 'E']
+
+def result_line(name_of_reagent, eqs, amount, unit):
+    return f'\n{round(amount, 2)} {unit} of {name_of_reagent} ({eqs} eq)'
+
+class CalculatorFrame(tk.Frame):
+    def __init__(self, parent, controller):
+        self.bg_color = 'bisque1'
+        super().__init__(parent, bg=self.bg_color)
+        self.pack(fill='both', expand=True, padx=10, pady=5)
+
+        # Set a controller
+        self.controller = controller
+
+        # Create frame with radiobuttons
+        frame_radio = tk.Frame(self, bg=self.bg_color)
+        tk.Label(frame_radio, text='Select number of reagents:', bg=self.bg_color).grid(row=0, column=0)
+        
+        list=['2 reagents', '3 reagents', '4 reagents', '5 reagents']
+        for i in range(4):
+            radiobtn = tk.Radiobutton(
+                frame_radio,
+                variable=self.controller.num_of_reagents,
+                value=i+2,
+                text=list[i], 
+                bg=self.bg_color,
+                activebackground=self.bg_color,
+                command=self.controller.update_view
+                )
+            radiobtn.grid(row=0, column=i+1)
+
+        frame_radio.pack(fill='both', expand=True, padx=10, pady=5)
+
+        # Store combobox variables and corresponding comboboxes, labels and entries
+        self.reagent_vars = {}  
+        self.reagent_comboboxes = {}
+        self.reagent_labels = {}
+        self.reagent_entries = {} 
+        self.entry_vars = {}
+        self.unit_labels = {}
+
+        # Pool of reagent slots (FrameTypeA) and the "+" signs before them, created on first use and then only shown or hidden
+        self.slot_frames = []
+        self.plus_frames = []
+        self.products_label = None
+               
+        # Create reaction scheme       
+        self.frame_scheme = tk.Frame(self, bg='white', borderwidth=2, relief='ridge')       
+        self.create_reaction_scheme(self.frame_scheme)
+        self.frame_scheme.pack(fill='both', expand=True, padx=10, pady=5)
+
+        # Create results frame
+        frame_results = tk.LabelFrame(self, text='Results', bg=self.bg_color)
+        
+        self.results_label = tk.Label(frame_results, text='', bg=self.bg_color)
+        self.results_label.pack()
+
+        frame_results.pack(fill='both', expand=True, padx=10, pady=5)
+
+        # Create button
+        tk.Button(self, text='Calculate', bg='beige', activebackground='beige', command=self.controller.calculate_button_clicked).pack(pady=5)
+
+    def create_reaction_scheme(self, frame):
+        """Shows alternating FrameTypeA and FrameTypeB for the selected number of reagents, ending with "-->products".
+
+        The frames are created the first time they are needed and hidden (not destroyed) when fewer
+        reagents are selected, so the selected reagents, amounts and images are kept.
+        """
+
+        num_of_reagents = self.controller.num_of_reagents.get()
+
+        # Create the slots that were not needed so far
+        for i in range(len(self.slot_frames), num_of_reagents):
+            reagent_var = tk.StringVar()  # Create an independent variable for each combobox
+            self.reagent_vars[i] = reagent_var  # Store in dictionary
+            if i == 0:
+                self.slot_frames.append(self.create_frame_type_A(frame, REAGENT_LABELS[i], '', i, reagent_var))
+            else:
+                self.plus_frames.append(self.create_frame_type_B(frame))
+                self.slot_frames.append(self.create_frame_type_A(frame, REAGENT_LABELS[i], 'eq', i, reagent_var))
+        if self.products_label is None:
+            self.products_label = tk.Label(frame, text='--> products', bg='white')
+
+        # Slot i is placed in column 2i, the "+" before it in column 2i - 1
+        for i, slot_frame in enumerate(self.slot_frames):
+            if i < num_of_reagents:
+                slot_frame.grid(row=0, column=2*i)
+            else:
+                slot_frame.grid_remove()
+        for i, plus_frame in enumerate(self.plus_frames, start=1):
+            if i < num_of_reagents:
+                plus_frame.grid(row=0, column=2*i - 1)
+            else:
+                plus_frame.grid_remove()
+
+        # Add the final "-->products" label instead of "+"
+        self.products_label.grid(row=0, column=2*num_of_reagents - 1)
+    
+    def create_frame_type_A(self, frm, label_text, unit, index, reagent_var):
+        """Creates a FrameTypeA containing a Combobox, Label, and Entry (with unit 'g')."""
+
+        frame = tk.Frame(frm, bg='white')
+
+        # Type-ahead: the dropdown lists only the reagents matching the typed text
+        reagent_combobox = ttk.Combobox(frame, background='white', textvariable=reagent_var)
+        reagent_combobox.configure(postcommand=lambda: self.controller.filter_reagents(reagent_combobox))
+        reagent_combobox.pack(padx=5, pady=5)
+        reagent_combobox.bind('<KeyRelease>', self.controller.reagent_key_released)
+        reagent_combobox.bind('<Return>', self.controller.complete_reagent)
+        reagent_combobox.bind('<FocusOut>', self.controller.accept_reagent)
+        reagent_combobox.bind('<<ComboboxSelected>>', lambda event, idx=index: self.controller.display_image(event, idx))
+        reagent_combobox.bind('<<ComboboxSelected>>', self.controller.remember_selection, add='+')
+        self.reagent_comboboxes[index] = reagent_combobox
+
+        reagent_label = tk.Label(frame, text=label_text, bg='white')
+        reagent_label.pack()
+
+        # Store label reference
+        self.reagent_labels[index] = reagent_label 
+
+        # Frame to hold entry and unit label
+        entry_frame = tk.Frame(frame, bg='white')
+
+        entry_var = tk.StringVar()
+        entry = tk.Entry(entry_frame, width=5, bg='white', textvariable=entry_var)
+        entry.pack(side=tk.LEFT)
+
+        # Store entry reference
+        self.reagent_entries[index] = entry
+        self.entry_vars[index] = entry_var
+
+        # Recalculate the results as the user types
+        reagent_var.trace_add('write', lambda *args, idx=index: self.controller.input_changed(idx))
+        entry_var.trace_add('write', lambda *args, idx=index: self.controller.input_changed(idx))
+
+        label_unit = tk.Label(entry_frame, bg='white', text=unit)
+        label_unit.pack(side=tk.LEFT)
+        self.unit_labels[index] = label_unit
+    
+        entry_frame.pack(padx=5, pady=5)
+
+        return frame
+    
+    def create_frame_type_B(self, frm):
+        """Creates a FrameB containing the "+" sign."""
+
+        frame = tk.Frame(frm, bg='white')
+
+        tk.Label(frame, text='+', bg='white').pack()
+
+        return frame
+
+class CalculatorController:
+    def __init__(self, parent, tasks):
+        self.parent = parent
+        self.tasks = tasks
+        self.num_of_reagents = tk.IntVar(value=2)
+
+        # State of the live recalculation: the moles of A and the result line of each other reagent are
+        # kept between keystrokes, and only the edited rows are recalculated
+        self._pending_recalculation = None
+        self._dirty_rows = set()
+        self._results_header = None
+        self._mols_of_A = None
+        self._result_rows = {}
+
+        # Create frame. The model and the search index are created once the library was read (see library_loaded),
+        # until then the handlers do nothing instead of waiting for it in the Tk thread
+        self.model = None
+        self.search_index = None
+        self.frame = CalculatorFrame(self.parent, self)  
+        self.thumbnails = ThumbnailCache()
+
+    def library_loaded(self, registry):
+        """Indexes the reagents for the type-ahead search once the library was read."""
+
+        self.model = CalculatorModel(registry)
+        self.search_index = ReagentSearchIndex(self.model.registry)
+        threading.Thread(target=self.search_index.prepare_fuzzy, name='search-index', daemon=True).start()
+
+        # Render the structures of the most used reagents in the background
+        self.thumbnails.prewarm([os.path.join(IMAGES_DIR, reagent['image']) for reagent in self.model.registry if reagent.get('image')], THUMBNAIL_HEIGHT)
+        self.library_changed()
+    
+    def update_view(self):
+        "Updates the reaction scheme and the results frame according to the radiobutton selected."
+        self.frame.create_reaction_scheme(self.frame.frame_scheme)
+        self.recalculate_all()
+
+    def library_changed(self):
+        """Brings the reaction scheme in line with the library after reagents were added, changed or removed, keeping the input."""
+
+        for index, combobox in self.frame.reagent_comboboxes.items():
+            if combobox['values']:  # Only dropdowns that were opened hold a list of reagents
+                self.filter_reagents(combobox)
+            if combobox.get():
+                self.display_image(None, index)
+        self.update_unit_label()
+        self.recalculate_all()
+
+    def recalculate_all(self):
+        """Recalculates all reagent rows at once, e.g. after the number of reagents or the library changed."""
+
+        if self._pending_recalculation is not None:
+            self.parent.after_cancel(self._pending_recalculation)
+        self._dirty_rows.add(0)
+        self.recalculate()
+
+    def input_changed(self, index):
+        """Schedules the recalculation of the edited reagent row (of all rows if reagent A was edited) once typing pauses."""
+
+        if index == 0:
+            self.update_unit_label()
+        self._dirty_rows.add(index)
+        if self._pending_recalculation is not None:
+            self.parent.after_cancel(self._pending_recalculation)
+        self._pending_recalculation = self.parent.after(RECALCULATION_DELAY, self.recalculate)
+
+    def recalculate(self):
+        """Recalculates the edited reagent rows and shows the results. Incomplete input is left out without a warning."""
+
+        self._pending_recalculation = None
+        if self.model is None:  # The edited rows are calculated once the library was read
+            return
+        dirty_rows, self._dirty_rows = self._dirty_rows, set()
+        num_of_reagents = self.num_of_reagents.get()
+
+        if 0 in dirty_rows:
+            self._results_header, self._mols_of_A = None, None
+            name_of_A = self.frame.reagent_vars[0].get()
+            try:
+                inital_amount_of_A = float(self.frame.reagent_entries[0].get())
+                self._mols_of_A = self.model.to_mols(name_of_A, inital_amount_of_A)
+            except ValueError:
+                pass
+            if self._mols_of_A is not None:
+                self._results_header = f'For {inital_amount_of_A} {self.model.registry.unit(name_of_A)} of {name_of_A}, measure:\n'
+            dirty_rows = range(1, num_of_reagents)
+
+        for i in dirty_rows:
+            if 0 < i < num_of_reagents:
+                self._result_rows[i] = self.calculate_row(i)
+
+        if self._mols_of_A is None:
+            self.frame.results_label.configure(text='')
+        else:
+            rows = [self._result_rows.get(i) or '' for i in range(1, num_of_reagents)]
+            self.frame.results_label.configure(text=self._results_header + ''.join(rows))
+
+    def calculate_row(self, index):
+        """Returns the result line of a reagent, or None if its input is incomplete."""
+
+        if self._mols_of_A is None:
+            return None
+        name_of_reagent = self.frame.reagent_vars[index].get()
+        try:
+            eqs = float(self.frame.reagent_entries[index].get())
+        except ValueError:
+            return None
+        amount = self.model.from_mols(name_of_reagent, self._mols_of_A*eqs)
+        if amount is None:
+            return None
+        return result_line(name_of_reagent, eqs, amount, self.model.registry.unit(name_of_reagent))
+    
+    def filter_reagents(self, combobox):
+        """Sets the dropdown of a reagent combobox to the reagents best matching its text (none while the library is read)."""
+        combobox['values'] = self.search_index.search(combobox.get(), limit=SEARCH_LIMIT) if self.search_index else []
+
+    def reagent_key_released(self, event):
+        if event.keysym not in ('Up', 'Down', 'Return', 'Escape', 'Tab'):
+            self.filter_reagents(event.widget)
+
+    def complete_reagent(self, event):
+        """Replaces the typed text with the best matching reagent and selects it."""
+
+        if self.search_index is None:
+            return
+        matches = self.search_index.search(event.widget.get(), limit=1)
+        if matches:
+            event.widget.set(matches[0])
+            event.widget.event_generate('<<ComboboxSelected>>')
+
+    def accept_reagent(self, event):
+        """Selects the reagent if its name was typed in full, so that its image and unit are shown."""
+
+        if self.model is None:
+            return
+        reagent = self.model.registry.get(event.widget.get())
+        if reagent is not None and reagent['name'] != getattr(event.widget, 'selected_name', None):
+            event.widget.set(reagent['name'])
+            event.widget.event_generate('<<ComboboxSelected>>')
+
+    def remember_selection(self, event):
+        event.widget.selected_name = event.widget.get()
+
+    def resize_image(self, image_path, new_height):
+        return resize_image(image_path, new_height)
+
+    def display_image(self, event, index):
+        """Changes the reagent label in reaction scheme to an image corresponding to the reagent selected in reagent combobox."""
+
+        if self.model is None:  # The images are shown once the library was read
+            return
+
+        # Get the name from combobox
+        name = self.frame.reagent_vars[index].get()
+
+        # Find the corresponding image
+        reagent = self.model.registry.get(name)
+
+        if not reagent or not reagent.get('image'):  # If no image is found, show the label text again
+            self.tasks.cancel(('image', index))
+            self.show_label_text(index)
+            return  
+
+        # Read and resize the image in the background. A newer selection in the same slot cancels the load
+        image_path = os.path.join(IMAGES_DIR, reagent['image'])
+        self.tasks.submit(self.load_thumbnail, image_path, key=('image', index),
+                          on_done=lambda thumbnail: self.show_image(index, thumbnail),
+                          on_error=lambda error: self.image_failed(index, error))
+
+    def load_thumbnail(self, image_path):
+        """Returns the cached thumbnail of an image (runs in a worker thread)."""
+
+        thumbnail = self.thumbnails.get(image_path, THUMBNAIL_HEIGHT)
+        self.thumbnails.record_use(image_path)
+        return thumbnail
+
+    def image_failed(self, index, error):
+        if not isinstance(error, OSError):
+            raise error
+        # The image file is missing or broken, so the image of the previous reagent must not stay
+        self.show_label_text(index)
+
+    def show_label_text(self, index):
+        self.frame.reagent_labels[index].config(image='', text=REAGENT_LABELS[index])
+        self.frame.reagent_labels[index].image = None
+
+    def show_image(self, index, thumbnail):
+        # Convert for Tkinter, which has to happen in the Tk thread
+        img = ImageTk.PhotoImage(thumbnail)
+
+        # Configure the label with the image
+        self.frame.reagent_labels[index].config(image=img, text='') # Clear text when setting an image
+        self.frame.reagent_labels[index].image = img # Keep a reference to the image
+
+    def update_unit_label(self):
+        """Updates the unit label of reagent A to the typed or selected reagent (g for solids, mL for liquids/solutions)."""
+        if self.model is None:
+            return
+        new_unit = self.model.registry.unit(self.frame.reagent_vars[0].get())
+        self.frame.unit_labels[0].config(text=new_unit or '')
+
+    def calculate_button_clicked(self):
+        '''Modifies the label in results frame displaying calculation results.'''
+        if self.model is None:
+            showwarning(title='Warning!', message='The library is still being read!')
+            return
+        try:
+            # First reagent
+            name_of_A = self.frame.reagent_vars[0].get()
+            unit_of_A = self.model.registry.unit(name_of_A)
+            inital_amount_of_A = float(self.frame.reagent_entries[0].get())
+
+            # Other reagents
+            reagents = [(self.frame.reagent_vars[i].get(), float(self.frame.reagent_entries[i].get())) for i in range(1, self.num_of_reagents.get())]
+            results = []
+            for name_of_reagent, eqs, amount, unit in self.model.calculate(name_of_A, inital_amount_of_A, reagents):
+                results.append(result_line(name_of_reagent, eqs, amount, unit))
+
+            # Update the label in results frame
+            measure = ''.join(results)
+            self.frame.results_label.configure(text=f'For {inital_amount_of_A} {unit_of_A} of {name_of_A}, measure:\n{measure}')
+
+        except ValueError:
+            showwarning(title='Warning!', message='Check input values!')
+        except (TypeError, KeyError):
+            showwarning(title='Warning!', message='Select reagents!')
+        
+class AddToDatabaseFrame(tk.Frame):
+    def __init__(self, parent, controller):
+        self.bg_color = 'bisque1'
+        super().__init__(parent, bg=self.bg_color)
+        self.pack(fill='both', expand=True, padx=10, pady=5)
+
+        # Set a controller
+        self.controller = controller
+
+        # Fix the first column's width
+        self.grid_columnconfigure(0, minsize=200)
+
+        self.create_widgets()
+
+    def create_widgets(self):
+        """Creates widgets based on the category selection."""
+
+        # Preserve name entry value if not empty
+        name_value = self.name_entry.get() if hasattr(self, 'name_entry') and self.name_entry.get().strip() else ''
+
+        # Clear existing widgets
+        for widget in self.winfo_children():
+            widget.destroy()
+
+        # Name
+        tk.Label(self, text='Name:', bg=self.bg_color).grid(row=0, column=0)
+        self.name_entry = tk.Entry(self)
+        self.name_entry.grid(row=0, column=1)
+
+        # Category
+        tk.Label(self, text='Category:', bg=self.bg_color).grid(row=1, column=0)
+
+        category_combobox = ttk.Combobox(self, textvariable=self.controller.category_var,
+                                              values=list(CATEGORIES),
+                                              state='readonly', width=17, background=self.bg_color)
+        category_combobox.grid(row=1,column=1)                    
+        category_combobox.bind('<<ComboboxSelected>>', self.controller.update_view)
+
+        # Molar Mass
+        tk.Label(self, text='Molar Mass [g/mol] or Formula:', bg=self.bg_color).grid(row=2, column=0)
+        self.molar_mass_entry = tk.Entry(self)
+        self.molar_mass_entry.grid(row=2, column=1)
+
+        # Image Filename
+        tk.Button(self, text='Select Image', bg='beige', activebackground='beige', command=self.controller.add_image_path).grid(row=5, column=0)
+        self.image_label = tk.Label(self, text='No image selected...', bg=self.bg_color)
+        self.image_label.grid(row=5, column=1)
+
+        # Submit Button
+        self.submit_button = tk.Button(self, text='Add Reagent', bg='beige', activebackground='beige', command=self.controller.add_reagent)
+        self.submit_button.grid(row=6, columnspan=2, pady=5)
+
+        # Restore name entry value if not empty
+        if name_value:
+            self.name_entry.insert(0, name_value)
+
+class AddToDatabaseController:
+    def __init__(self, app, parent):
+        self.app = app
+        self.parent = parent 
+        self.bg_color = 'bisque1'
+        self.category_var = tk.StringVar(value='solid')
+
+        # Create the frame
+        self.frame = AddToDatabaseFrame(self.parent, self)
+        
+    def update_view(self, event):
+        """Updates the frame according to the category selected."""
+
+        category = self.category_var.get()
+
+        self.frame.create_widgets()
+
+        if category == 'liquid':
+            tk.Label(self.frame, text='Density [g/mL]:', bg=self.bg_color).grid(row=3, column=0)
+            self.density_entry = tk.Entry(self.frame)
+            self.density_entry.grid(row=3, column=1)
+        elif category == 'percent solution':
+            tk.Label(self.frame, text='Solution Concentration [%]:', bg=self.bg_color).grid(row=3, column=0)
+            self.percent_conc_entry = tk.Entry(self.frame)
+            self.percent_conc_entry.grid(row=3, column=1)
+
+            tk.Label(self.frame, text='Solution Density [g/mL]:', bg=self.bg_color).grid(row=4, column=0)
+            self.sol_density_entry = tk.Entry(self.frame)
+            self.sol_density_entry.grid(row=4, column=1)
+        elif category == 'molar solution':
+            tk.Label(self.frame, text='Solution Concentration [mol/L]:', bg=self.bg_color).grid(row=3, column=0)
+            self.molar_conc_entry = tk.Entry(self.frame)
+            self.molar_conc_entry.grid(row=3, column=1)  
+    
+    def add_image_path(self):
+        image_path = askopenfilename(initialdir=IMAGES_DIR)
+        if image_path:  # If a file is selected, update the entry widget
+            image = os.path.basename(image_path)
+            self.frame.image_label.config(text=image)
+
+    def add_reagent(self):
+        """Collects input and adds to database."""
+
+        try:
+            # The molar mass can be typed in or calculated from a formula
+            formula = None
+            try:
+                molar_mass_value = float(self.frame.molar_mass_entry.get())
+            except ValueError:
+                formula = self.frame.molar_mass_entry.get().strip()
+                molar_mass_value = round(molar_mass(formula), 2)  # Raises ValueError for an invalid formula
+
+            reagent = {
+                'name': self.frame.name_entry.get(),
+                'category': self.category_var.get(),
+                'molar mass': molar_mass_value
+            }
+
+            # Add additional properties based on category
+            if reagent['category'] == 'liquid':
+                reagent['density'] = float(self.density_entry.get())
+            elif reagent['category'] == 'percent solution':
+                reagent['solution concentration'] = float(self.percent_conc_entry.get())
+                reagent['solution density'] = float(self.sol_density_entry.get())
+            elif reagent['category'] == 'molar solution':
+                reagent['solution concentration'] = float(self.molar_conc_entry.get())  
+
+            # Zero, negative and non-finite values are rejected, as by the importer
+            for key in ('molar mass', 'density', 'solution concentration', 'solution density'):
+                if key in reagent and not (reagent[key] > 0 and math.isfinite(reagent[key])):
+                    raise ValueError(f'Invalid {key}: {reagent[key]}')
+
+            if not self.frame.image_label.cget('text') == 'No image selected...':
+                reagent['image'] = self.frame.image_label.cget('text')
+            else:
+                reagent['image'] = ''
+            if formula:
+                reagent['formula'] = formula
+
+        except ValueError:
+            showwarning(title='Warning!', message='Check the input values!')
+            return
+
+        # A second entry with the same name would be ignored when the library is read
+        if self.app.library_watcher is not None and self.app.library_watcher.registry.get(reagent['name']) is not None:
+            showwarning(title='Warning!', message=f'{reagent["name"]} is already in the database!')
+            return
+
+        # Update the database in the background, so that a slow (e.g. network) drive does not freeze the window
+        self.frame.submit_button.config(state='disabled')
+        self.app.tasks.submit(ReagentStore(library_path()).append, reagent,
+                              on_done=lambda result: self.reagent_saved(reagent), on_error=self.reagent_not_saved)
+
+    def reagent_saved(self, reagent):
+        # The library watcher may have picked up the reagent from the file already. If the library is still
+        # being read, the reagent is read with it
+        if self.app.library_watcher is not None:
+            self.app.library_watcher.registry.merge([reagent], partial=True)
+
+        # Clear the input values
+        self.frame.submit_button.config(state='normal')
+        for widget in self.frame.winfo_children():
+            if isinstance(widget, tk.Entry):
+                widget.delete(0, tk.END)
+        self.frame.image_label.config(text='No image selected...')
+        
+        # Update view in Tab1
+        self.app.update_view()
+        
+        showinfo(title='Success!', message='The reagent was added to the database!')
+
+    def reagent_not_saved(self, error):
+        self.frame.submit_button.config(state='normal')
+        if not isinstance(error, OSError):
+            raise error
+        showwarning(title='Warning!', message=f'The reagent could not be saved: {error}')
+
+class CalculatorApp(tk.Tk):
+    def __init__(self):
+        super().__init__()
+
+        # Window settings
+        self.title('Equivalents Calculator')
+        self.resizable(0, 0)
+
+        # Create Tabs
+        self.notebook = ttk.Notebook(self)  
+        self.tab1 = tk.Frame(self.notebook, bg='bisque1')
+        self.tab2 = tk.Frame(self.notebook, bg='bisque1')
+        self.notebook.add(self.tab1, text='calculate equivalents')
+        self.notebook.add(self.tab2, text='add reagents to database')
+        self.notebook.pack(fill='both', expand=True)
+
+        # Create controllers
+        self.tasks = TaskRunner(self)
+        self.calculator_controller = CalculatorController(self.tab1, self.tasks)
+        AddToDatabaseController(self, self.tab2)
+
+        # Read the library in the background, the window is usable meanwhile
+        self.library_watcher = None
+        self.tasks.submit(LibraryWatcher.start, library_path(), get_registry, on_done=self.library_loaded, on_error=self.library_not_loaded)
+
+    def library_loaded(self, library_watcher):
+        self.calculator_controller.library_loaded(library_watcher.registry)
+
+        # Pick up reagents that other users add to the library
+        self.library_watcher = library_watcher
+        self.after(LIBRARY_POLL_INTERVAL, self.poll_library)
+
+    def library_not_loaded(self, error):
+        if not isinstance(error, (OSError, ValueError)):
+            raise error
+        showwarning(title='Warning!', message=f'The library could not be read: {error}')
+
+    def destroy(self):
+        self.tasks.shutdown()
+        self.calculator_controller.thumbnails.save_usage()
+        super().destroy()
+
+    def update_view(self):
+        """Updates the view in Tab1 after a new reagent was added in Tab2. This ensures the new reagent is immediately accessible for calculations in Tab1."""
+
+        self.calculator_controller.library_changed()
+
+    def poll_library(self):
+        """Reads changes of the library files in the background, so that a slow (e.g. network) drive does not freeze the window."""
+        self.tasks.submit(self.library_watcher.read, on_done=self.library_polled, on_error=self.library_poll_failed)
+
+    def library_polled(self, changes):
+        """Merges changes of the library file into the registry and refreshes Tab1 if any reagent was added, changed or removed."""
+
+        try:
+            if any(self.library_watcher.apply(changes)):
+                self.update_view()
+        except MALFORMED_ERRORS as error:
+            self.library_malformed(error)
+        finally:
+            self.after(LIBRARY_POLL_INTERVAL, self.poll_library)
+
+    def library_poll_failed(self, error):
+        try:
+            if isinstance(error, MALFORMED_ERRORS):
+                self.library_malformed(error)
+            elif not isinstance(error, OSError):
+                raise error
+            # Otherwise the file is being replaced, try again on the next poll
+        finally:
+            self.after(LIBRARY_POLL_INTERVAL, self.poll_library)
+
+    def library_malformed(self, error):
+        # Shown once per version of the files, as the watcher skips a malformed version until the files change
+        showwarning(title='Warning!', message=f'The changes of the library could not be read: {error}')
+
+instrument.register(CalculatorFrame, 'create_reaction_scheme')
+instrument.register(CalculatorController, 'update_view', 'library_changed', 'recalculate', 'display_image', 'load_thumbnail', 'show_image', 'calculate_button_clicked')
+instrument.register(AddToDatabaseController, 'add_reagent', 'reagent_saved')
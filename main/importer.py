@@ -0,0 +1,207 @@
+"""Bulk import of reagents, e.g. from vendor catalogs.
+
+Reads reagents from a CSV file (with a header row) or an SDF file, validates them (in parallel
+processes for large files) and adds the valid ones to the library in a single write:
+
+    python importer.py catalog.csv [--library LIBRARY] [--jobs N] [--dry-run]
+
+CSV columns (in any order and case): name, category, formula, molar mass, density, solution
+concentration, solution density, image and synonyms (separated by "|"). SDF records give the same
+fields as data items (e.g. <FORMULA> or <MW>); the name defaults to the title line of the record.
+The category defaults to solid, and the molar mass is calculated from the formula if it is missing.
+Reagents whose names are already in the library or earlier in the file are reported and skipped.
+"""
+
+import os
+import sys
+import csv
+import math
+from concurrent.futures import ProcessPoolExecutor
+from cli import parse_jobs
+from core import CATEGORIES, DEFAULT_LIBRARY_PATH, conversion_factors, load_library, normalize_name
+from formula import molar_mass
+from store import ReagentStore
+
+# Records below this number are validated in this process, as starting the worker processes would take longer
+PARALLEL_THRESHOLD = 5000
+
+# Other names of the fields in vendor files
+ALIASES = {
+    'mw': 'molar mass', 'molecular weight': 'molar mass', 'molar weight': 'molar mass', 'molecular mass': 'molar mass',
+    'mf': 'formula', 'molecular formula': 'formula', 'concentration': 'solution concentration',
+}
+
+# Properties required for each category besides the molar mass
+PROPERTIES = {
+    'solid': (),
+    'liquid': ('density',),
+    'percent solution': ('solution concentration', 'solution density'),
+    'molar solution': ('solution concentration',),
+}
+
+def _field_name(key: str) -> str:
+    key = ' '.join(key.replace('_', ' ').split()).lower()
+    return ALIASES.get(key, key)
+
+def _positive_number(fields: dict, key: str) -> float:
+    if key not in fields:
+        raise ValueError(f'Missing {key}')
+    try:
+        value = float(fields[key])
+    except ValueError:
+        raise ValueError(f'Invalid {key}: {fields[key]}') from None
+    if not (value > 0 and math.isfinite(value)):
+        raise ValueError(f'Invalid {key}: {fields[key]}')
+    return value
+
+def parse_record(record: dict) -> dict:
+    """Converts the fields of a CSV row or SDF record into a reagent entry.
+
+    Raises ValueError if a field is missing or invalid.
+    """
+
+    fields = {_field_name(key): value.strip() for key, value in record.items() if key and value and value.strip()}
+    if 'name' not in fields:
+        raise ValueError('Missing name')
+    category = fields.get('category', 'solid').lower()
+    if category not in CATEGORIES:
+        raise ValueError(f'Unknown category: {fields["category"]}')
+
+    reagent = {'name': ' '.join(fields['name'].split()), 'category': category}
+    if 'molar mass' in fields:
+        reagent['molar mass'] = _positive_number(fields, 'molar mass')
+    elif 'formula' in fields:
+        reagent['molar mass'] = round(molar_mass(fields['formula']), 2)
+    else:
+        raise ValueError('Missing molar mass or formula')
+    for key in PROPERTIES[category]:
+        reagent[key] = _positive_number(fields, key)
+    reagent['image'] = fields.get('image', '')
+    if 'formula' in fields:
+        reagent['formula'] = fields['formula']
+    if 'synonyms' in fields:
+        reagent['synonyms'] = [synonym.strip() for synonym in fields['synonyms'].split('|') if synonym.strip()]
+
+    if conversion_factors(reagent) == (None, None):
+        raise ValueError('Incomplete entry')
+    return reagent
+
+def validate_record(record: dict) -> tuple:
+    """Returns (reagent, None) for a valid record and (None, error message) otherwise."""
+
+    try:
+        return parse_record(record), None
+    except ValueError as error:
+        return None, str(error)
+
+def read_csv(file):
+    """Yields (line number, fields) for each row of a CSV file with a header row."""
+
+    reader = csv.DictReader(file)
+    for row in reader:
+        if any(value and value.strip() for value in row.values() if isinstance(value, str)):
+            yield reader.line_num, {key: value for key, value in row.items() if isinstance(value, str)}
+
+def _sdf_record(record: dict, molfile: list) -> dict:
+    # Without a name item, the title line of the molfile names the reagent
+    if molfile and molfile[0].strip() and not any(_field_name(key) == 'name' for key in record):
+        record['name'] = molfile[0].strip()
+    return record
+
+def read_sdf(file):
+    """Yields (line number of the record, fields) for each record of an SDF file."""
+
+    record, start, item = {}, 1, None
+    lines = []
+    for line_num, line in enumerate(file, start=1):
+        line = line.rstrip('\r\n')
+        if line.strip() == '$$$$':
+            if record or lines:
+                yield start, _sdf_record(record, lines)
+            record, start, item, lines = {}, line_num + 1, None, []
+        elif line.startswith('>') and '<' in line and '>' in line[1:]:
+            item = line[line.index('<') + 1:line.index('>', line.index('<'))]
+            record[item] = ''
+        elif item is not None:
+            if line.strip():
+                record[item] = f'{record[item]}\n{line}' if record[item] else line
+            else:
+                item = None
+        else:
+            lines.append(line)
+    if record:
+        yield start, _sdf_record(record, lines)
+
+def validate_records(records: list, jobs: int = None) -> list:
+    """Returns (reagent, error message) for each record, in order. Many records are validated by a pool of processes."""
+
+    workers = jobs or os.cpu_count() or 1
+    if workers == 1 or len(records) < PARALLEL_THRESHOLD:
+        return [validate_record(record) for record in records]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(validate_record, records, chunksize=max(1, len(records)//(4*workers))))
+
+def import_reagents(path: str, library: str = None, jobs: int = None, dry_run: bool = False) -> tuple:
+    """Adds the valid reagents from a CSV or SDF file to a library.
+
+    Parameters
+    ----------
+    path : str
+        The CSV or SDF file (told apart by the extension .sdf or .sd).
+
+    library : str
+        Path of the library (library.json next to this module by default).
+
+    jobs : int
+        Number of processes to validate with (all CPUs by default).
+
+    dry_run : bool
+        If True, the reagents are only validated.
+
+    Returns
+    -------
+    tuple
+        The added reagent entries, and (line number, error message) tuples for the skipped records.
+    """
+
+    reader = read_sdf if os.path.splitext(path)[1].lower() in ('.sdf', '.sd') else read_csv
+    with open(path, 'r', encoding='utf-8-sig', newline='') as file:
+        rows = list(reader(file))
+    results = validate_records([record for _, record in rows], jobs)
+
+    library = library or DEFAULT_LIBRARY_PATH
+    known = set(normalize_name(name) for name in load_library(library).names()) if os.path.exists(library) else set()
+    added, errors = [], []
+    for (line_num, _), (reagent, error) in zip(rows, results):
+        if error is None:
+            key = normalize_name(reagent['name'])
+            if key in known:
+                error = f'Already in the library: {reagent["name"]}'
+            else:
+                known.add(key)
+                added.append(reagent)
+        if error is not None:
+            errors.append((line_num, error))
+
+    if added and not dry_run:
+        ReagentStore(library).extend(added)
+    return added, errors
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Add the reagents from a CSV or SDF file to the library.')
+    parser.add_argument('input', help='CSV or SDF file with the reagents')
+    parser.add_argument('--library', default=DEFAULT_LIBRARY_PATH, help='path of the library (default: library.json next to this file)')
+    parser.add_argument('--jobs', type=parse_jobs, help='number of processes to validate with, 0 for all CPUs (default: all CPUs)')
+    parser.add_argument('--dry-run', action='store_true', help='only validate the reagents')
+    args = parser.parse_args(argv)
+
+    added, errors = import_reagents(args.input, args.library, args.jobs, args.dry_run)
+    for line_num, error in errors:
+        print(f'line {line_num}: {error}', file=sys.stderr)
+    print(f'{len(added)} reagents {"valid" if args.dry_run else "added"}, {len(errors)} skipped.')
+    return 1 if errors else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""Opt-in timing instrumentation.
+
+Modules register the functions and methods worth timing (model conversions, Tk callbacks, library
+load and save). Nothing is wrapped unless instrumentation is enabled, so it costs nothing when off.
+It is enabled by setting the EQS_CALC_PROFILE environment variable, or by the --profile option of
+equivalents.py, cli.py and service.py:
+
+    EQS_CALC_PROFILE=1              print the statistics to stderr on exit
+    EQS_CALC_PROFILE=profile.json   write them to profile.json on exit
+
+The statistics hold the call count, total, mean and maximum time and a latency histogram for each
+timed function. The service also serves them at GET /metrics.
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import bisect
+import functools
+import threading
+
+# Upper bounds of the histogram buckets in seconds (1-2-5 steps from 1 µs to 10 s, then everything slower)
+BUCKETS = [factor*10.0**exponent for exponent in range(-6, 1) for factor in (1, 2, 5)] + [10.0]
+
+enabled = False
+_targets = []  # (owner, attribute, metric name)
+_originals = {}  # (owner, attribute) -> original function
+_stats = {}  # metric name -> [count, total, max, bucket counts]
+_lock = threading.Lock()
+
+def record(metric: str, seconds: float):
+    """Adds a timing to the statistics of a metric."""
+
+    with _lock:
+        stats = _stats.get(metric)
+        if stats is None:
+            stats = _stats[metric] = [0, 0.0, 0.0, [0]*(len(BUCKETS) + 1)]
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] = max(stats[2], seconds)
+        stats[3][bisect.bisect_left(BUCKETS, seconds)] += 1
+
+def _wrap(owner, attribute: str, metric: str):
+    if (owner, attribute) in _originals:
+        return
+    function = getattr(owner, attribute)
+
+    @functools.wraps(function)
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            record(metric, time.perf_counter() - start)
+
+    _originals[(owner, attribute)] = function
+    setattr(owner, attribute, timed)
+
+def register(owner, *attributes: str):
+    """Registers functions of a module or methods of a class to be timed while instrumentation is enabled."""
+
+    prefix = getattr(owner, '__qualname__', owner.__name__)
+    for attribute in attributes:
+        target = (owner, attribute, f'{prefix}.{attribute}')
+        _targets.append(target)
+        if enabled:
+            _wrap(*target)
+
+def enable(dump_path: str = None, dump_at_exit: bool = True):
+    """Starts timing the registered functions. The statistics are dumped on exit (to stderr if no path is given)."""
+
+    global enabled
+    if not enabled:
+        enabled = True
+        for target in _targets:
+            _wrap(*target)
+        if dump_at_exit:
+            atexit.register(dump, dump_path)
+
+def disable():
+    """Stops timing and restores the original functions. The statistics are kept."""
+
+    global enabled
+    enabled = False
+    for (owner, attribute), function in _originals.items():
+        setattr(owner, attribute, function)
+    _originals.clear()
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+def _percentile(buckets: list, count: int, fraction: float) -> float:
+    """Estimates a percentile as the upper bound of the histogram bucket it falls into."""
+
+    rank = fraction*count
+    seen = 0
+    for bound, bucket_count in zip(BUCKETS + [float('inf')], buckets):
+        seen += bucket_count
+        if seen >= rank:
+            return bound
+    return float('inf')
+
+def snapshot() -> dict:
+    """Returns the statistics of all metrics as a JSON-serializable dict."""
+
+    with _lock:
+        stats = {metric: (count, total, maximum, list(buckets)) for metric, (count, total, maximum, buckets) in _stats.items()}
+
+    metrics = {}
+    for metric, (count, total, maximum, buckets) in sorted(stats.items()):
+        labels = [f'<={bound:g}s' for bound in BUCKETS] + [f'>{BUCKETS[-1]:g}s']
+        metrics[metric] = {
+            'count': count,
+            'total s': total,
+            'mean s': total/count,
+            'max s': maximum,
+            'p50 s': _percentile(buckets, count, 0.50),
+            'p99 s': min(_percentile(buckets, count, 0.99), maximum),
+            'histogram': {label: bucket_count for label, bucket_count in zip(labels, buckets) if bucket_count},
+        }
+    return {'enabled': enabled, 'metrics': metrics}
+
+def dump(path: str = None):
+    """Writes the statistics as JSON to a file, or to stderr if no path is given."""
+
+    text = json.dumps(snapshot(), indent=2)
+    if path:
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(text)
+    else:
+        print(text, file=sys.stderr)
+
+_setting = os.environ.get('EQS_CALC_PROFILE', '')
+if _setting and _setting != '0':
+    enable(None if _setting == '1' else _setting)
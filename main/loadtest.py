@@ -0,0 +1,123 @@
+"""Load test of the HTTP/JSON service (service.py).
+
+Sends POST requests over several keep-alive connections and reports the throughput and latency
+percentiles as JSON. Without --port, a local service is started for the duration of the test.
+
+    python loadtest.py --requests 20000 --connections 16 --batch 96
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import subprocess
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Returns the value below which the given fraction of the (sorted) values lie, by the nearest-rank method."""
+
+    if not sorted_values:
+        return float('nan')
+    rank = min(max(1, math.ceil(fraction*len(sorted_values))), len(sorted_values))
+    return sorted_values[rank - 1]
+
+def make_request(host: str, path: str, payload) -> bytes:
+    body = json.dumps(payload).encode('utf-8')
+    head = f'POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n'
+    return head.encode('latin-1') + body
+
+async def run_connection(host: str, port: int, request: bytes, count: int, latencies: list, errors: list):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(count):
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status_line = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':', 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if status_line.split()[1] != b'200':
+                errors.append(status_line.decode('latin-1').strip())
+    finally:
+        writer.close()
+
+async def run_load_test(host: str, port: int, path: str, payload, requests: int, connections: int) -> dict:
+    request = make_request(host, path, payload)
+    latencies, errors = [], []
+    counts = [requests//connections + (i < requests % connections) for i in range(connections)]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_connection(host, port, request, count, latencies, errors) for count in counts if count))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'path': path,
+        'requests': len(latencies),
+        'connections': connections,
+        'errors': len(errors),
+        'seconds': elapsed,
+        'requests per second': len(latencies)/elapsed,
+        'p50 latency ms': percentile(latencies, 0.50)*1000,
+        'p99 latency ms': percentile(latencies, 0.99)*1000,
+        'max latency ms': latencies[-1]*1000 if latencies else float('nan'),
+    }
+
+def make_payload(path: str, batch: int):
+    """Builds a request body for the endpoint from reagents of the default library."""
+
+    from core import get_registry
+
+    names = get_registry().names()
+    if path == '/calculate':
+        setups = [{'limiting reagent': names[i % len(names)], 'amount': 1.0,
+                   'reagents': [[names[(i + 1) % len(names)], 1.5], [names[(i + 2) % len(names)], 2.0]]} for i in range(batch)]
+        return setups if batch > 1 else setups[0]
+    key = 'amounts' if path == '/to_mols' else 'mols'
+    return {'reagents': [names[i % len(names)] for i in range(batch)], key: [0.001*(i + 1) for i in range(batch)]}
+
+def start_service() -> tuple:
+    """Starts service.py on a free port and returns the process and the port."""
+
+    process = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'service.py'), '--port', '0'],
+                               stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line.startswith('Listening on'):
+        process.kill()
+        raise RuntimeError('The service did not start!')
+    return process, int(line.rsplit(':', 1)[1])
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Measure requests per second and latency of the calculator service.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, help='port of a running service (default: start a local one)')
+    parser.add_argument('--path', choices=['/calculate', '/to_mols', '/from_mols'], default='/calculate', help='endpoint to load (default: /calculate)')
+    parser.add_argument('--requests', type=int, default=10000, help='total number of requests (default: 10000)')
+    parser.add_argument('--connections', type=int, default=8, help='number of concurrent keep-alive connections (default: 8)')
+    parser.add_argument('--batch', type=int, default=1, help='reaction setups or reagents per request (default: 1)')
+    args = parser.parse_args(argv)
+
+    process, port = (None, args.port) if args.port else start_service()
+    try:
+        payload = make_payload(args.path, args.batch)
+        result = asyncio.run(run_load_test(args.host, port, args.path, payload, args.requests, args.connections))
+        result['batch'] = args.batch
+        print(json.dumps(result, indent=2))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    return 1 if result['errors'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
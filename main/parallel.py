@@ -0,0 +1,104 @@
+"""Process-parallel calculation of large setup files.
+
+cli.py --jobs N hands chunks of the input to a pool of worker processes. The parent process only
+splits the file into records; the workers parse, calculate and format whole chunks, so the run scales
+with the number of cores. The results are written in input order, and rows that fail (unknown reagents,
+invalid numbers or JSON) are reported as in a serial run without stopping it.
+
+The reagent table is copied once into shared memory as a snapshot (see table.py), and every worker maps
+it from there instead of reading the library or unpickling a copy of it.
+"""
+
+import os
+import io
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from core import CalculatorModel
+from cli import WRITERS, CSVWriter, calculate_setups, parse_records, read_records
+from table import ReagentTable
+
+# Records per task: large enough that the transfer costs little compared to the calculation
+CHUNK_SIZE = 2000
+
+# State of a worker process, set up by _init_worker
+_worker = {}
+
+def _init_worker(shared_memory_name: str, input_format: str, output_format: str):
+    shared_memory = SharedMemory(name=shared_memory_name)
+    table, _ = ReagentTable.from_buffer(shared_memory.buf)
+    _worker.update(shared_memory=shared_memory, model=CalculatorModel(table), input_format=input_format, output_format=output_format)
+
+def _calculate_chunk(records: list) -> tuple:
+    """Calculates a chunk of records in a worker. Returns the formatted output and whether any setup failed."""
+
+    model = _worker['model']
+    output = io.StringIO()
+    writer = WRITERS[_worker['output_format']](output, model)
+    failed = False
+    for row in calculate_setups(parse_records(records, _worker['input_format']), model):
+        failed = failed or row[3] is not None
+        writer.write(*row)
+    return output.getvalue(), failed
+
+def calculate_file(file, input_format: str, output, output_format: str, table: ReagentTable, jobs: int = None,
+                   chunk_size: int = CHUNK_SIZE) -> bool:
+    """Calculates the reaction setups of a file in worker processes.
+
+    Parameters
+    ----------
+    file : file
+        The CSV or JSONL input (see cli.py).
+
+    input_format : str
+        'csv' or 'jsonl'.
+
+    output : file
+        The file the results are written to, in input order.
+
+    output_format : str
+        One of cli.WRITERS.
+
+    table : ReagentTable
+        The reagents to calculate with.
+
+    jobs : int
+        Number of worker processes (all CPUs by default).
+
+    chunk_size : int
+        Number of records per task.
+
+    Returns
+    -------
+    bool
+        True if any setup failed.
+    """
+
+    workers = jobs or os.cpu_count() or 1
+    if output_format == 'csv':
+        CSVWriter.write_header(output)
+    records = read_records(file, input_format)
+    failed = False
+
+    shared_memory = SharedMemory(create=True, size=table.snapshot_size())
+    try:
+        table.write_snapshot(shared_memory.buf)
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(shared_memory.name, input_format, output_format)) as executor:
+            # A bounded number of chunks is in flight, so that the input is read as fast as it is calculated
+            pending = deque()
+            while True:
+                while len(pending) < 2*workers:
+                    chunk = list(itertools.islice(records, chunk_size))
+                    if not chunk:
+                        break
+                    pending.append(executor.submit(_calculate_chunk, chunk))
+                if not pending:
+                    break
+                text, chunk_failed = pending.popleft().result()
+                output.write(text)
+                failed = failed or chunk_failed
+    finally:
+        shared_memory.close()
+        shared_memory.unlink()
+    return failed
@@ -0,0 +1,155 @@
+"""Campaign planner.
+
+Calculates the amounts for a whole campaign of reactions in one batched pass and sums them up per
+reagent, so that the total mass (g) or volume (mL) of each reagent can be prepared at once. The
+reaction setups are read as in cli.py (CSV or JSONL, any number of reagents per reaction):
+
+    python planner.py campaign.csv
+"""
+
+import sys
+import numpy as np
+from core import CalculatorModel, library_path, set_library_path
+
+def flatten_setups(setups) -> tuple:
+    """Splits reaction setups into columns: the limiting reagents, their amounts, and one row per other reagent."""
+
+    names_of_A, amounts_of_A, names, eqs, reactions = [], [], [], [], []
+    for reaction, (name_of_A, amount_of_A, reagents) in enumerate(setups):
+        names_of_A.append(name_of_A)
+        amounts_of_A.append(amount_of_A)
+        for name, eq in reagents:
+            names.append(name)
+            eqs.append(eq)
+            reactions.append(reaction)
+    return (np.array(names_of_A, dtype=str), np.array(amounts_of_A, dtype=float),
+            np.array(names, dtype=str), np.array(eqs, dtype=float), np.array(reactions, dtype=np.intp))
+
+def convert_batch(convert, positions, values) -> np.ndarray:
+    """Converts with to_mols_batch or from_mols_batch of a model, giving NaN for unknown reagents (position -1)."""
+
+    # Unknown reagents are converted with the first entry and masked afterwards
+    converted = convert(np.maximum(positions, 0), values)
+    converted[positions < 0] = np.nan
+    return converted
+
+def setup_error(registry, name_of_A: str, reagents, message: str) -> str:
+    """Returns why a reaction could not be calculated: its first unknown reagent, otherwise `message`."""
+
+    for name in [name_of_A] + [name for name, _ in reagents]:
+        if registry.get(name) is None:
+            return f'Unknown reagent: {name}'
+    return message
+
+def calculate_campaign(setups, model: CalculatorModel = None) -> tuple:
+    """Calculates the amounts of all reagents of many reactions at once.
+
+    Parameters
+    ----------
+    setups : iterable
+        (limiting reagent, amount, [(reagent, eq), ...]) reaction setups.
+
+    model : CalculatorModel
+        The model to calculate with (the default library if omitted).
+
+    Returns
+    -------
+    tuple
+        NumPy columns: registry positions and amounts of the limiting reagents, registry positions and
+        amounts of the other reagents, the reaction each of those belongs to, and whether each reaction
+        could be calculated. Unknown reagents have the position -1; the amounts of reactions that could
+        not be calculated are NaN.
+    """
+
+    model = model or CalculatorModel()
+    names_of_A, amounts_of_A, names, eqs, reactions = flatten_setups(setups)
+    positions_of_A = model.registry.positions(names_of_A, missing=-1)
+    positions = model.registry.positions(names, missing=-1)
+
+    mols_of_A = convert_batch(model.to_mols_batch, positions_of_A, amounts_of_A)
+    amounts = convert_batch(model.from_mols_batch, positions, mols_of_A[reactions]*eqs)
+
+    valid = np.isfinite(mols_of_A)
+    valid[reactions[~np.isfinite(amounts)]] = False
+    amounts[~valid[reactions]] = np.nan
+    amounts_of_A = np.where(valid, amounts_of_A, np.nan)
+    return positions_of_A, amounts_of_A, positions, amounts, reactions, valid
+
+def plan_campaign(setups, model: CalculatorModel = None) -> tuple:
+    """Sums up the amounts of each reagent over all reactions of a campaign.
+
+    Parameters
+    ----------
+    setups : sequence
+        (limiting reagent, amount, [(reagent, eq), ...]) reaction setups.
+
+    model : CalculatorModel
+        The model to calculate with (the default library if omitted).
+
+    Returns
+    -------
+    tuple
+        (name, total amount, unit, number of reactions) tuples in library order, and (index of the setup,
+        error message) tuples for the reactions that could not be calculated and are left out of the totals.
+    """
+
+    model = model or CalculatorModel()
+    registry = model.registry
+    positions_of_A, amounts_of_A, positions, amounts, reactions, valid = calculate_campaign(setups, model)
+
+    all_positions = np.concatenate([positions_of_A[valid], positions[valid[reactions]]])
+    all_amounts = np.concatenate([amounts_of_A[valid], amounts[valid[reactions]]])
+    totals = np.bincount(all_positions, weights=all_amounts, minlength=len(registry))
+    counts = np.bincount(all_positions, minlength=len(registry))
+
+    plan = []
+    for position in np.flatnonzero(counts).tolist():
+        name = registry.reagents[position]['name']
+        plan.append((name, float(totals[position]), registry.unit(name), int(counts[position])))
+
+    errors = []
+    for index in np.flatnonzero(~valid).tolist():
+        name_of_A, _, reagents = setups[index]
+        errors.append((index, setup_error(registry, name_of_A, reagents, 'Incomplete library entry or invalid amount')))
+    return plan, errors
+
+def main(argv=None) -> int:
+    import csv
+    import argparse
+    from cli import detect_format, read_setups
+    from table import load_table
+
+    parser = argparse.ArgumentParser(description='Sum up the reagent amounts of a campaign of reactions read from a CSV or JSONL file.')
+    parser.add_argument('input', nargs='?', default='-', help='file with reaction setups (default: stdin)')
+    parser.add_argument('--format', choices=['auto', 'csv', 'jsonl'], default='auto', help='input format (default: from the file extension)')
+    parser.add_argument('--library', help='path of the reagent library (default: library.json next to this file)')
+    args = parser.parse_args(argv)
+    if args.library:
+        set_library_path(args.library)
+
+    file = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8', newline='')
+    setups, line_nums, errors = [], [], []
+    try:
+        input_format = detect_format(file, args.input) if args.format == 'auto' else args.format
+        for line_num, setup, error in read_setups(file, input_format):
+            if error is None:
+                setups.append(setup)
+                line_nums.append(line_num)
+            else:
+                errors.append((line_num, error))
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+    plan, calculation_errors = plan_campaign(setups, CalculatorModel(load_table(library_path())))
+    errors = sorted(errors + [(line_nums[index], error) for index, error in calculation_errors])
+
+    writer = csv.writer(sys.stdout, lineterminator='\n')
+    writer.writerow(['reagent', 'total', 'unit', 'reactions'])
+    writer.writerows(plan)
+    for line_num, error in errors:
+        print(f'line {line_num}: {error}', file=sys.stderr)
+    return 1 if errors else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
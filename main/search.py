@@ -0,0 +1,146 @@
+"""Search index over reagent names and synonyms.
+
+Matches are ranked as: names or synonyms starting with the query, then names containing a word that
+starts with the query (e.g. "hcl" finds "2M HCl"), then fuzzy matches that share most of the query's
+character trigrams (which tolerates typos). Synonyms are read from an optional "synonyms" list of a
+library entry.
+"""
+
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+from core import normalize_name
+
+# Share of the query's trigrams a fuzzy match must contain
+FUZZY_THRESHOLD = 0.5
+
+# Reagents added to the trigram index at a time by prepare_fuzzy, between which searches can run
+TRIGRAM_CHUNK = 2000
+
+def _trigrams(key: str) -> set:
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _terms(reagent: dict) -> list:
+    synonyms = reagent.get('synonyms') or []
+    return [normalize_name(term) for term in [reagent['name'], *synonyms] if isinstance(term, str) and term.strip()]
+
+class ReagentSearchIndex:
+    """Prefix and trigram index over the names and synonyms of a registry.
+
+    The index follows the registry: reagents appended to it are indexed on the next search, and the
+    index is rebuilt if entries were replaced or removed (e.g. by a hot reload). The trigram index for
+    fuzzy matches is built on the first fuzzy search, or ahead of it by prepare_fuzzy in another thread.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self._lock = threading.RLock()
+        self._rebuild()
+
+    def _rebuild(self):
+        self._prefixes = []  # Sorted (term, position)
+        self._word_prefixes = []  # Sorted (term from the start of its second, third, ... word, position)
+        self._trigrams = {}
+        self._trigram_size = 0  # Reagents in the trigram index
+        self._size = 0
+        self._generation = self.registry.generation
+        self._sync()
+
+    def _sync(self):
+        if self._generation != self.registry.generation:
+            self._rebuild()
+            return
+
+        reagents = self.registry.reagents
+        new_entries = len(reagents) - self._size
+        if new_entries <= 0:
+            return
+
+        prefixes, word_prefixes = [], []
+        for position in range(self._size, len(reagents)):
+            for term in _terms(reagents[position]):
+                prefixes.append((term, position))
+                start = term.find(' ')
+                while start != -1:
+                    word_prefixes.append((term[start + 1:], position))
+                    start = term.find(' ', start + 1)
+
+        # Sort all at once when building, keep the lists sorted when a few reagents are added
+        if new_entries > 16:
+            self._prefixes = sorted(self._prefixes + prefixes)
+            self._word_prefixes = sorted(self._word_prefixes + word_prefixes)
+        else:
+            for entry in prefixes:
+                insort(self._prefixes, entry)
+            for entry in word_prefixes:
+                insort(self._word_prefixes, entry)
+        self._size = len(reagents)
+
+    def _prefix_matches(self, entries, key):
+        start = bisect_left(entries, (key,))
+        for i in range(start, len(entries)):
+            term, position = entries[i]
+            if not term.startswith(key):
+                break
+            yield position
+
+    def _index_trigrams(self, limit: int):
+        """Adds up to `limit` reagents to the trigram index. Returns False once all reagents are in it."""
+
+        reagents = self.registry.reagents
+        end = min(self._size, self._trigram_size + limit)
+        for position in range(self._trigram_size, end):
+            for term in _terms(reagents[position]):
+                for trigram in _trigrams(term):
+                    self._trigrams.setdefault(trigram, set()).add(position)
+        self._trigram_size = end
+        return end < self._size
+
+    def prepare_fuzzy(self):
+        """Builds the trigram index in chunks, so that searches from other threads are not blocked for long."""
+
+        while True:
+            with self._lock:
+                self._sync()
+                try:
+                    if not self._index_trigrams(TRIGRAM_CHUNK):
+                        return
+                except IndexError:  # Reagents were removed meanwhile, the next search rebuilds the index
+                    return
+
+    def _fuzzy_matches(self, key):
+        reagents = self.registry.reagents
+        self._index_trigrams(len(reagents))
+
+        trigrams = _trigrams(key)
+        hits = Counter()
+        for trigram in trigrams:
+            hits.update(self._trigrams.get(trigram, ()))
+        minimum = FUZZY_THRESHOLD*len(trigrams)
+        matches = [(-count, len(reagents[position]['name']), position) for position, count in hits.items() if count >= minimum]
+        return [position for _, _, position in sorted(matches)]
+
+    def search(self, query: str, limit: int = 50) -> list:
+        """Returns the names of up to `limit` reagents matching the query, best matches first."""
+
+        with self._lock:
+            return self._search(normalize_name(query), limit)
+
+    def _search(self, key, limit):
+        self._sync()
+        reagents = self.registry.reagents
+        if not key:
+            return [reagent['name'] for reagent in reagents[:limit]]
+
+        found = {}  # Ordered set of positions
+        for matches in (self._prefix_matches(self._prefixes, key), self._prefix_matches(self._word_prefixes, key)):
+            for position in matches:
+                found.setdefault(position)
+                if len(found) >= limit:
+                    return [reagents[position]['name'] for position in found]
+        for position in self._fuzzy_matches(key):
+            found.setdefault(position)
+            if len(found) >= limit:
+                break
+        return [reagents[position]['name'] for position in found]
@@ -0,0 +1,266 @@
+"""Local HTTP/JSON service of the Equivalents Calculator.
+
+The reagent library is read once and kept indexed in memory (changes of the library files are merged
+in, as in the app). All endpoints take and return JSON:
+
+    GET  /health        {"status": "ok", "reagents": <number of reagents>}
+    GET  /metrics       call counts and latencies when run with --profile (see instrument.py)
+    POST /to_mols       {"reagents": [names or registry indices], "amounts": [g or mL]}  ->  {"mols": [...]}
+    POST /from_mols     {"reagents": [names or registry indices], "mols": [mol]}         ->  {"amounts": [...], "units": [...]}
+    POST /calculate     a reaction setup as in the JSONL input of cli.py, or a list of them
+    POST /max_scale     {"reactions": [{"limiting reagent": name, "reagents": [[name, eq], ...]}, ...], "inventory": {name: g or mL}}
+
+For /to_mols and /from_mols, null marks an incomplete library entry. /calculate answers a list of
+setups with a list of results, in which a failed setup is reported as {"error": message}. /max_scale
+answers {"results": [...]} with the largest amount of the limiting reagent of each reaction, its unit
+and the reagent that runs out first, or {"error": message}.
+
+Run it with `python service.py [--host HOST] [--port PORT]`; the service only listens on localhost by default.
+"""
+
+import sys
+import json
+import math
+import asyncio
+import instrument
+from core import CalculatorModel, get_registry, library_path, set_library_path
+from cli import calculate_setup, format_result, parse_number, parse_setup
+from solver import max_scales
+from watcher import LibraryWatcher
+
+DEFAULT_PORT = 8765
+LIBRARY_POLL_INTERVAL = 2  # s
+MAX_BODY_SIZE = 64 << 20
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large', 431: 'Request Header Fields Too Large'}
+
+class RequestError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+def _floats(values) -> list:
+    """Converts a NumPy array to a list of floats with None for NaN and infinity, which JSON cannot represent."""
+    return [value if math.isfinite(value) else None for value in values.tolist()]
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+async def _read_line(reader: asyncio.StreamReader) -> bytes:
+    try:
+        return await reader.readline()
+    except ValueError:  # Longer than the limit of the stream (64 KiB)
+        raise RequestError(431, 'Request line or header too long') from None
+
+class CalculatorService:
+    def __init__(self, model: CalculatorModel = None):
+        self.model = model or CalculatorModel()
+        self.routes = {
+            ('GET', '/health'): self.health,
+            ('GET', '/metrics'): self.metrics,
+            ('POST', '/to_mols'): self.to_mols,
+            ('POST', '/from_mols'): self.from_mols,
+            ('POST', '/calculate'): self.calculate,
+            ('POST', '/max_scale'): self.max_scale,
+        }
+
+    def health(self, body):
+        return {'status': 'ok', 'reagents': len(self.model.registry)}
+
+    def metrics(self, body):
+        return instrument.snapshot()
+
+    def _batch(self, body, amounts_key):
+        if not isinstance(body, dict) or not isinstance(body.get('reagents'), list) or not isinstance(body.get(amounts_key), list):
+            raise RequestError(400, f'Expected "reagents" and "{amounts_key}" lists!')
+        if len(body['reagents']) != len(body[amounts_key]):
+            raise RequestError(400, f'"reagents" and "{amounts_key}" differ in length!')
+        if not (all(isinstance(name, str) for name in body['reagents'])
+                or all(isinstance(name, int) and not isinstance(name, bool) for name in body['reagents'])):
+            raise RequestError(400, 'Reagents must be all names or all registry indices!')
+        if not all(_is_number(amount) for amount in body[amounts_key]):
+            raise RequestError(400, f'"{amounts_key}" must be numbers!')
+        return body['reagents'], [parse_number(amount) for amount in body[amounts_key]]
+
+    def to_mols(self, body):
+        names, amounts = self._batch(body, 'amounts')
+        return {'mols': _floats(self.model.to_mols_batch(names, amounts))}
+
+    def from_mols(self, body):
+        names, mols = self._batch(body, 'mols')
+        registry = self.model.registry
+        units = ['g' if code == 0 else 'mL' for code in registry.columns()['category'][registry.positions(names)].tolist()]
+        return {'amounts': _floats(self.model.from_mols_batch(names, mols)), 'units': units}
+
+    def _calculate(self, setup):
+        try:
+            setup = parse_setup(setup)
+            return format_result(self.model, setup, calculate_setup(self.model, setup), None)
+        except (ValueError, TypeError) as error:
+            return format_result(self.model, None, None, str(error))
+        except KeyError as error:
+            return format_result(self.model, None, None, error.args[0])
+
+    def calculate(self, body):
+        if isinstance(body, list):
+            return [self._calculate(setup) for setup in body]
+        result = self._calculate(body)
+        if 'error' in result:
+            raise RequestError(400, result['error'])
+        return result
+
+    def max_scale(self, body):
+        if not isinstance(body, dict) or not isinstance(body.get('reactions'), list) or not isinstance(body.get('inventory'), dict):
+            raise RequestError(400, 'Expected a "reactions" list and an "inventory" object!')
+        setups = []
+        for reaction in body['reactions']:
+            if not isinstance(reaction, dict) or not isinstance(reaction.get('limiting reagent'), str):
+                raise RequestError(400, 'Each reaction needs a "limiting reagent"!')
+            reagents = reaction.get('reagents', [])
+            if not isinstance(reagents, list) or not all(isinstance(pair, list) and len(pair) == 2 and isinstance(pair[0], str)
+                                                         and _is_number(pair[1]) for pair in reagents):
+                raise RequestError(400, '"reagents" must be a list of [name, eq] pairs!')
+            setups.append((reaction['limiting reagent'], [(name, parse_number(eq)) for name, eq in reagents]))
+        if not all(isinstance(name, str) and _is_number(amount) for name, amount in body['inventory'].items()):
+            raise RequestError(400, 'The inventory must give a number for each reagent!')
+        inventory = {name: parse_number(amount) for name, amount in body['inventory'].items()}
+
+        results, errors = max_scales(setups, inventory, self.model)
+        errors = dict(errors)
+        return {'results': [
+            {'error': errors[index]} if result is None else {'amount': result[0], 'unit': result[1], 'binding reagent': result[2]}
+            for index, result in enumerate(results)
+        ]}
+
+    def handle(self, method: str, path: str, body: bytes) -> tuple:
+        """Returns the status and the JSON response for a request."""
+
+        route = self.routes.get((method, path))
+        if route is None:
+            if any(route_path == path for _, route_path in self.routes):
+                return 405, {'error': f'{method} is not allowed for {path}'}
+            return 404, {'error': f'Unknown path: {path}'}
+        try:
+            return 200, route(json.loads(body) if body else None)
+        except RequestError as error:
+            return error.status, {'error': str(error)}
+        except ValueError as error:  # Invalid JSON or amounts
+            return 400, {'error': str(error)}
+        except (OverflowError, RecursionError):  # Numbers out of range or JSON nested too deeply
+            return 400, {'error': 'Invalid request body!'}
+        except (KeyError, IndexError) as error:  # Unknown reagents
+            return 400, {'error': error.args[0] if error.args else str(error)}
+
+    async def serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Answers the requests of one connection, keeping it open between requests unless the client closes it."""
+
+        try:
+            while True:
+                try:
+                    request_line = await _read_line(reader)
+                    if not request_line.strip():
+                        break
+                    try:
+                        method, target, version = request_line.decode('latin-1').split()
+                    except ValueError:
+                        raise RequestError(400, 'Malformed request line') from None
+
+                    headers = {}
+                    while True:
+                        line = await _read_line(reader)
+                        if line in (b'\r\n', b'\n', b''):
+                            break
+                        key, _, value = line.decode('latin-1').partition(':')
+                        headers[key.strip().lower()] = value.strip()
+                except RequestError as error:
+                    await self._respond(writer, error.status, {'error': str(error)}, keep_alive=False)
+                    break
+
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if not 0 <= length <= MAX_BODY_SIZE:
+                    await self._respond(writer, 413 if length > 0 else 400, {'error': 'Invalid Content-Length'}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection == 'keep-alive' or (version == 'HTTP/1.1' and connection != 'close')
+                status, response = self.handle(method, target.split('?', 1)[0], body)
+                await self._respond(writer, status, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, response, keep_alive):
+        body = json.dumps(response, ensure_ascii=False).encode('utf-8')
+        head = (f'HTTP/1.1 {status} {REASONS[status]}\r\n'
+                'Content-Type: application/json; charset=utf-8\r\n'
+                f'Content-Length: {len(body)}\r\n'
+                f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n')
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+async def watch_library(watcher: LibraryWatcher):
+    """Merges changes of the library files into the registry, like the app does.
+
+    The files are read in a worker thread, so that reading a large library does not hold up the requests;
+    the changes are merged on the event loop, between requests.
+    """
+
+    while True:
+        await asyncio.sleep(LIBRARY_POLL_INTERVAL)
+        try:
+            watcher.apply(await asyncio.to_thread(watcher.read))
+        except OSError:  # The file is being replaced, try again on the next poll
+            pass
+        except Exception as error:  # Malformed entries, logged once as the watcher skips them until the files change
+            print(f'The library could not be merged: {error!r}', file=sys.stderr)
+
+async def serve(host: str = '127.0.0.1', port: int = DEFAULT_PORT, ready=None):
+    """Runs the service until it is cancelled. `ready` is called with the listening server once it accepts connections."""
+
+    service = CalculatorService()
+    watcher = LibraryWatcher.start(library_path(), get_registry)  # Read and index the library before the first request
+    server = await asyncio.start_server(service.serve_client, host, port)
+    watch_task = asyncio.create_task(watch_library(watcher))
+    if ready is not None:
+        ready(server)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        watch_task.cancel()
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Serve the Equivalents Calculator over HTTP/JSON.')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'port to listen on, 0 for any free port (default: {DEFAULT_PORT})')
+    parser.add_argument('--library', help='path of the reagent library (default: library.json next to this file)')
+    parser.add_argument('--profile', nargs='?', const='', metavar='FILE', help='time model calls, requests and library access and write the statistics to FILE (default: stderr) on exit')
+    args = parser.parse_args(argv)
+    if args.profile is not None:
+        instrument.enable(args.profile or None)
+    if args.library:
+        set_library_path(args.library)
+
+    def ready(server):
+        host, port = server.sockets[0].getsockname()[:2]
+        print(f'Listening on http://{host}:{port}', flush=True)
+
+    try:
+        asyncio.run(serve(args.host, args.port, ready))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+instrument.register(CalculatorService, 'handle')
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""Maximum scale of reactions with the reagents on hand.
+
+Runs the calculation of the app in reverse: given the equivalents of the reagents of a reaction and
+the stock of each reagent (g, or mL of liquids and solutions), it finds the largest amount of the
+limiting reagent A the reaction can be run with, and the reagent that runs out first. A reagent listed
+more than once, or also as A, is needed for all of its equivalents together. Any number of reactions
+is solved at once against the same inventory; each reaction is solved as if it was the only one to
+use the inventory.
+
+    >>> max_scales([('caffeine', [('pyridine', 2)])], {'caffeine': 10, 'pyridine': 5})  # doctest: +ELLIPSIS
+    ([(6.01..., 'g', 'pyridine')], [])
+
+CalculatorModel.max_scale solves a single reaction the same way.
+"""
+
+import numpy as np
+from core import CalculatorModel
+from planner import convert_batch, flatten_setups, setup_error
+
+def calculate_max_scales(setups, inventory: dict, model: CalculatorModel = None) -> tuple:
+    """Calculates the largest amounts of the limiting reagents of many reactions at once.
+
+    Parameters
+    ----------
+    setups : iterable
+        (limiting reagent, [(reagent, eq), ...]) reaction setups.
+
+    inventory : dict
+        The amount on hand of each reagent (mL for liquids and solutions or g for solids). Reagents
+        missing from it are not on hand, and infinity marks a reagent that never runs out.
+
+    model : CalculatorModel
+        The model to calculate with (the default library if omitted).
+
+    Returns
+    -------
+    tuple
+        NumPy columns with one entry per reaction: the registry position of the limiting reagent,
+        its largest amount, the corresponding moles and the registry position of the reagent that runs
+        out first. Reactions with unknown reagents, incomplete library entries or equivalents that are
+        not positive have the amount NaN and the binding position -1.
+
+    Raises
+    ------
+    ValueError
+        If an amount on hand is negative.
+    """
+
+    model = model or CalculatorModel()
+    registry = model.registry
+    names_of_A, _, names, eqs, reactions = flatten_setups((name_of_A, 0, reagents) for name_of_A, reagents in setups)
+    positions_of_A = registry.positions(names_of_A, missing=-1)
+    positions = registry.positions(names, missing=-1)
+
+    # The stock of each reagent, looked up by registry position
+    stock = np.zeros(len(registry))
+    inventory_positions = registry.positions(list(inventory), missing=-1)
+    known = inventory_positions >= 0
+    on_hand = np.asarray(list(inventory.values()), dtype=float)
+    if not np.all(on_hand >= 0):
+        name, amount = next((name, amount) for name, amount in inventory.items() if not amount >= 0)
+        raise ValueError(f'Invalid amount of {name} on hand: {amount}')
+    stock[inventory_positions[known]] = on_hand[known]
+
+    # A is used as 1 eq of itself; its rows come first, so that it binds when another reagent runs out as early
+    count = len(positions_of_A)
+    all_positions = np.concatenate([positions_of_A, positions])
+    all_eqs = np.concatenate([np.ones(count), eqs])
+    all_reactions = np.concatenate([np.arange(count, dtype=np.intp), reactions])
+
+    # Reagents listed more than once in a reaction (or also as A) share their stock, so their equivalents are summed
+    keys = all_reactions*(len(registry) + 1) + all_positions + 1
+    _, first_rows, groups = np.unique(keys, return_index=True, return_inverse=True)
+    group_positions = all_positions[first_rows]
+    group_reactions = all_reactions[first_rows]
+    group_eqs = np.bincount(groups.ravel(), weights=all_eqs, minlength=len(first_rows))
+
+    # Moles of A that the stock of each distinct reagent suffices for (the stock of unknown reagents is masked)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        limits = convert_batch(model.to_mols_batch, group_positions, stock[group_positions])/group_eqs
+
+    valid = np.ones(count, dtype=bool)
+    valid[all_reactions[~(all_eqs > 0)]] = False
+    valid[group_reactions[np.isnan(limits)]] = False
+
+    # The reagent with the smallest limit binds, the first listed one on ties
+    order = np.lexsort((first_rows, limits, group_reactions))
+    _, firsts = np.unique(group_reactions[order], return_index=True)
+    binding_groups = order[firsts]
+
+    mols_of_A = np.where(valid, limits[binding_groups], np.nan)
+    binding = np.where(valid, group_positions[binding_groups], -1)
+    amounts_of_A = convert_batch(model.from_mols_batch, positions_of_A, mols_of_A)
+    return positions_of_A, amounts_of_A, mols_of_A, binding
+
+def max_scales(setups, inventory: dict, model: CalculatorModel = None) -> tuple:
+    """Finds the largest amount each reaction can be run with.
+
+    Parameters
+    ----------
+    setups : sequence
+        (limiting reagent, [(reagent, eq), ...]) reaction setups.
+
+    inventory : dict
+        The amount on hand of each reagent (mL for liquids and solutions or g for solids).
+
+    model : CalculatorModel
+        The model to calculate with (the default library if omitted).
+
+    Returns
+    -------
+    tuple
+        (largest amount of the limiting reagent, its unit, name of the reagent that runs out first) for
+        each reaction (None for those that could not be calculated), and (index of the setup, error
+        message) tuples for the reactions that could not be calculated.
+
+    Raises
+    ------
+    ValueError
+        If an amount on hand is negative.
+    """
+
+    model = model or CalculatorModel()
+    registry = model.registry
+    _, amounts_of_A, _, binding = calculate_max_scales(setups, inventory, model)
+
+    results, errors = [], []
+    for index, (amount_of_A, binding_position) in enumerate(zip(amounts_of_A.tolist(), binding.tolist())):
+        name_of_A, reagents = setups[index]
+        if binding_position >= 0:
+            results.append((amount_of_A, registry.unit(name_of_A), registry.reagents[binding_position]['name']))
+            continue
+
+        results.append(None)
+        invalid = [name for name, eqs in reagents if not eqs > 0]
+        errors.append((index, setup_error(registry, name_of_A, reagents, f'Invalid equivalents of {invalid[0]}' if invalid else 'Incomplete library entry')))
+    return results, errors
@@ -0,0 +1,242 @@
+"""Transactional storage of the reagent library.
+
+library.json keeps its format. Reagents added later are appended to a journal next to it
+(library.json.journal, one JSON object per line), which is merged into library.json once it grows
+beyond a size limit. Every read and write holds a lock on library.json.lock, so several users can add
+reagents to a library on a shared drive without overwriting each other's additions. library.json is
+only ever replaced atomically.
+
+The first line of the journal records the size and modification time of the library.json it belongs
+to. If library.json was replaced by anything other than a compaction (e.g. edited by hand), journal
+entries whose names are already in the library are not applied again.
+"""
+
+import os
+import sys
+import json
+import threading
+import instrument
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+JOURNAL_VERSION = 1
+
+def file_signature(path: str):
+    """Identifies the current version of a file by its size and modification time (None if it does not exist)."""
+
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+def write_atomic(path: str, write, binary: bool = False):
+    """Writes a file with `write(file)` to a temporary file next to it, which then replaces the file.
+
+    Readers see either the old or the complete new file. The temporary file is named after the process
+    and thread, so that concurrent writers do not share it, and it is removed if writing fails.
+    """
+
+    temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        with open(temp_path, 'wb') if binary else open(temp_path, 'w', encoding='utf-8') as file:
+            write(file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+class ReagentStore:
+    def __init__(self, path: str, compact_size: int = 1 << 20):
+        self.path = os.path.abspath(path)
+        self.journal_path = self.path + '.journal'
+        self.lock_path = self.path + '.lock'
+        self.compact_size = compact_size
+        self._thread_lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self, required: bool = True):
+        """Holds the lock of the library, both against other threads and other processes.
+
+        If the lock file cannot be created (a read-only library) and the lock is not required, the library is used without it.
+        """
+
+        with self._thread_lock:
+            try:
+                lock_file = open(self.lock_path, 'a+b')
+            except OSError:  # E.g. no write permission or a read-only file system
+                if required:
+                    raise
+                yield
+                return
+
+            with lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    else:
+                        lock_file.seek(0)
+                        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _read_header(self):
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as file:
+                return json.loads(file.readline())
+        except (OSError, ValueError):
+            return None
+
+    def _is_current(self, header) -> bool:
+        return isinstance(header, dict) and header.get('journal') == JOURNAL_VERSION and header.get('base') == file_signature(self.path)
+
+    def _read_journal(self) -> tuple:
+        """Returns the journal header and the reagents recorded in it."""
+
+        header, reagents = None, []
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as file:
+                lines = iter(file)
+                header = json.loads(next(lines, 'null'))
+                for line in lines:
+                    if not line.endswith('\n'):
+                        break  # A write that was interrupted before it completed
+                    reagents.append(json.loads(line))
+        except FileNotFoundError:
+            return None, []
+        except ValueError:
+            pass
+        return header, reagents
+
+    def _read(self) -> list:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                reagents = json.load(file)
+        except FileNotFoundError:
+            reagents = []
+
+        header, journal = self._read_journal()
+        if journal and not self._is_current(header):
+            names = {reagent.get('name') for reagent in reagents}
+            journal = [reagent for reagent in journal if reagent.get('name') not in names]
+        return reagents + journal
+
+    def read_journal_from(self, offset: int) -> tuple:
+        """Returns the reagents appended to the journal after the given byte offset and the offset of its end.
+
+        Only complete lines are read, so the returned offset can be passed in again to read the next additions.
+        """
+
+        with open(self.journal_path, 'rb') as file:
+            file.seek(offset)
+            tail = file.read()
+        end = tail.rfind(b'\n') + 1
+        lines = tail[:end].decode('utf-8').splitlines()
+        if offset == 0:
+            lines = lines[1:]  # The header
+        return [json.loads(line) for line in lines if line.strip()], offset + end
+
+    def load(self) -> list:
+        """Returns all reagents of the library, including the ones in the journal."""
+
+        with self._locked(required=False):
+            return self._read()
+
+    def _compact(self, reagents: list = None):
+        if reagents is None:
+            reagents = self._read()
+        write_atomic(self.path, lambda file: json.dump(reagents, file, indent=2))
+        header = {'journal': JOURNAL_VERSION, 'base': file_signature(self.path)}
+        write_atomic(self.journal_path, lambda file: file.write(json.dumps(header) + '\n'))
+
+    def _repair_journal(self):
+        """Cuts off the end of a journal write that was interrupted before it completed."""
+
+        with open(self.journal_path, 'r+b') as file:
+            size = file.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            file.seek(size - 1)
+            if file.read(1) != b'\n':
+                file.seek(0)
+                file.truncate(file.read().rfind(b'\n') + 1)
+
+    def compact(self):
+        """Merges the journal into library.json."""
+
+        with self._locked():
+            self._compact()
+
+    def extend(self, reagents: list):
+        """Adds reagents to the library in a single atomic write."""
+
+        lines = ''.join(json.dumps(reagent, ensure_ascii=False) + '\n' for reagent in reagents)
+        with self._locked():
+            if not self._is_current(self._read_header()):
+                self._compact()
+            self._repair_journal()
+            with open(self.journal_path, 'a', encoding='utf-8') as file:
+                file.write(lines)
+                file.flush()
+                os.fsync(file.fileno())
+                journal_size = file.tell()
+            if journal_size > self.compact_size:
+                self._compact()
+
+    def append(self, reagent: dict):
+        """Adds a reagent to the library."""
+        self.extend([reagent])
+
+    def export(self, path: str):
+        """Writes all reagents to a file in the library.json format."""
+
+        reagents = self.load()
+        write_atomic(os.path.abspath(path), lambda file: json.dump(reagents, file, indent=2))
+
+    def import_library(self, path: str) -> int:
+        """Adds the reagents from a file in the library.json format. Returns the number of reagents added."""
+
+        with open(path, 'r', encoding='utf-8') as file:
+            reagents = json.load(file)
+        self.extend(reagents)
+        return len(reagents)
+
+instrument.register(ReagentStore, 'load', 'extend', 'compact')
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Maintain the reagent library.')
+    parser.add_argument('--library', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'library.json'), help='path of the library (default: library.json next to this file)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('compact', help='merge the journal into the library')
+    commands.add_parser('export', help='write the whole library to a file in the library.json format').add_argument('file')
+    commands.add_parser('import', help='add the reagents from a file in the library.json format').add_argument('file')
+    args = parser.parse_args(argv)
+
+    store = ReagentStore(args.library)
+    if args.command == 'compact':
+        store.compact()
+    elif args.command == 'export':
+        store.export(args.file)
+    else:
+        print(f'{store.import_library(args.file)} reagents added.')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
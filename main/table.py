@@ -0,0 +1,375 @@
+"""Columnar reagent table with a memory-mapped binary snapshot.
+
+A ReagentTable holds the library as typed NumPy columns (category code, molar mass, density, solution
+concentration, solution density and the precomputed conversion factors) and interned UTF-8 string tables
+of the names and image paths, instead of one dict per reagent. Names are looked up in a hash table of
+their normalized forms, which is part of the snapshot as well. The table can be used wherever a read-only
+ReagentRegistry is expected.
+
+The table is saved next to the library as a versioned binary snapshot (library.json.snapshot):
+
+    8 bytes     SNAPSHOT_MAGIC
+    8 bytes     length of the header (little endian)
+    header      JSON: snapshot version, size and modification time of library.json and its journal,
+                number of reagents and the dtype, offset and length of each array
+    arrays      each aligned to 8 bytes
+
+The snapshot is memory-mapped, so opening it copies nothing and takes the same time for any number
+of reagents. load_table regenerates it whenever library.json or its journal changed.
+"""
+
+import sys
+import json
+import mmap
+import struct
+import zlib
+import numpy as np
+import instrument
+from core import CATEGORIES, DEFAULT_LIBRARY_PATH, conversion_factor_columns, lookup_positions, normalize_name
+from store import ReagentStore, file_signature, write_atomic
+
+SNAPSHOT_MAGIC = b'EQSCALC\x00'
+SNAPSHOT_VERSION = 1
+
+# Reagent properties kept in float columns, all other keys of an entry are kept as JSON
+PROPERTIES = ('molar mass', 'density', 'solution concentration', 'solution density')
+
+class _Strings:
+    """Sequence of the byte strings of a name table (a blob and the offsets of its strings)."""
+
+    def __init__(self, blob, offsets):
+        # Memory views index faster than NumPy arrays and still do not copy
+        self.blob = memoryview(blob)
+        self.offsets = memoryview(offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]])
+
+    def decode_all(self) -> list:
+        blob = self.blob.tobytes()
+        offsets = self.offsets.tolist()
+        return [blob[start:end].decode('utf-8') for start, end in zip(offsets, offsets[1:])]
+
+def _string_table(strings: list) -> tuple:
+    """Returns the UTF-8 blob of strings and the offsets at which each of them starts (and the last ends)."""
+
+    text = ''.join(strings)
+    blob = text.encode('utf-8')
+    # The lengths in characters are the lengths in bytes unless there are non-ASCII characters
+    lengths = map(len, strings) if len(blob) == len(text) else (len(string.encode('utf-8')) for string in strings)
+    offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(lengths, dtype=np.int64, count=len(strings)), out=offsets[1:])
+    return np.frombuffer(blob, dtype=np.uint8), offsets
+
+def _hash_table(keys: list) -> np.ndarray:
+    """Builds an open addressing hash table (with linear probing) of the positions of the keys.
+
+    The table has a power of two of at least twice as many slots as keys; empty slots hold -1. A key is
+    looked up from the slot given by the CRC-32 of its UTF-8 form. Only the first position of a key
+    is stored, so the first of several entries with the same name wins, as in ReagentRegistry.
+    """
+
+    slots = np.full(1 << max(1, 2*len(keys) - 1).bit_length(), -1, dtype=np.int64)
+    mask = len(slots) - 1
+    first_positions = {}
+    for position, key in enumerate(keys):
+        first_positions.setdefault(key, position)
+    positions = np.fromiter(first_positions.values(), dtype=np.int64, count=len(first_positions))
+    hashes = np.fromiter((zlib.crc32(key.encode('utf-8')) for key in first_positions), dtype=np.int64, count=len(first_positions))
+
+    # Place all keys at once, probing one slot further in each round for the keys that found their slot taken
+    probe = 0
+    while len(positions):
+        targets = (hashes + probe) & mask
+        free = slots[targets] < 0
+        # Of several keys aiming at the same free slot, the one from the earlier position gets it
+        _, winners = np.unique(targets[free], return_index=True)
+        placed = np.flatnonzero(free)[winners]
+        slots[targets[placed]] = positions[placed]
+        remaining = np.ones(len(positions), dtype=bool)
+        remaining[placed] = False
+        positions, hashes = positions[remaining], hashes[remaining]
+        probe += 1
+    return slots
+
+class _ReagentView:
+    """Read-only sequence of the reagent entries of a table, created as dicts when accessed."""
+
+    def __init__(self, table):
+        self.table = table
+
+    def __len__(self):
+        return len(self.table)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self.table.entry(i) for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError('Table index out of range!')
+        return self.table.entry(position)
+
+    def __iter__(self):
+        return (self.table.entry(position) for position in range(len(self)))
+
+class ReagentTable:
+    """Reagents stored in NumPy columns, with the lookup interface of ReagentRegistry.
+
+    The table cannot be changed; use ReagentRegistry for a library that reagents are added to.
+    """
+
+    # A table never changes, see ReagentRegistry.generation
+    generation = 0
+
+    def __init__(self, arrays: dict, buffer=None):
+        self.arrays = arrays
+        self._buffer = buffer  # Keeps the memory map of a snapshot open
+        self._names = _Strings(arrays['names'], arrays['name offsets'])
+        self._keys = _Strings(arrays['keys'], arrays['key offsets'])
+        self._slots = memoryview(arrays['slots'])
+        self._images = _Strings(arrays['images'], arrays['image offsets'])
+        self._extras = _Strings(arrays['extras'], arrays['extra offsets'])
+        self.reagents = _ReagentView(self)
+
+    @classmethod
+    def from_reagents(cls, reagents: list) -> 'ReagentTable':
+        """Builds a table from reagent entries in the library.json format."""
+
+        codes = {category: code for code, category in enumerate(CATEGORIES)}
+        nan = float('nan')
+        values = {key: [nan]*len(reagents) for key in PROPERTIES}
+        categories = [-1]*len(reagents)
+        images, extras = [], []
+        for position, reagent in enumerate(reagents):
+            image, extra = None, {}
+            for key, value in reagent.items():
+                if key == 'name':
+                    continue
+                if key == 'category' and value in codes:
+                    categories[position] = codes[value]
+                elif key in PROPERTIES and type(value) in (int, float):
+                    values[key][position] = value
+                elif key == 'image' and isinstance(value, str):
+                    image = value
+                else:  # Other keys, and values that cannot be stored in a column
+                    extra[key] = value
+            images.append(image)
+            extras.append(json.dumps(extra, ensure_ascii=False) if extra else '')
+        columns = {key: np.array(values[key], dtype=float) for key in PROPERTIES}
+        columns['category'] = np.array(categories, dtype=np.int8)
+        mols_per_unit, units_per_mol = conversion_factor_columns(columns)
+
+        names = [reagent['name'] for reagent in reagents]
+        keys = [normalize_name(name) for name in names]
+
+        arrays = {key: columns[key] for key in ('category',) + PROPERTIES}
+        arrays['mols per unit'] = mols_per_unit
+        arrays['units per mol'] = units_per_mol
+        arrays['names'], arrays['name offsets'] = _string_table(names)
+        arrays['keys'], arrays['key offsets'] = _string_table(keys)
+        arrays['slots'] = _hash_table(keys)
+        arrays['images'], arrays['image offsets'] = _string_table([image or '' for image in images])
+        arrays['has image'] = np.array([image is not None for image in images], dtype=bool)
+        arrays['extras'], arrays['extra offsets'] = _string_table(extras)
+        return cls(arrays)
+
+    def _snapshot_header(self, source) -> tuple:
+        """Returns the start of a snapshot of the table (magic, header size and header) and the size of the whole snapshot."""
+
+        header = {'version': SNAPSHOT_VERSION, 'source': source, 'count': len(self), 'arrays': {}}
+        offset = 0
+        for name, array in self.arrays.items():
+            header['arrays'][name] = {'dtype': array.dtype.str, 'offset': offset, 'length': len(array)}
+            offset += -(-array.nbytes//8)*8
+        header_bytes = json.dumps(header).encode('utf-8')
+        header_bytes += b' '*(-len(header_bytes) % 8)
+        start = SNAPSHOT_MAGIC + struct.pack('<Q', len(header_bytes)) + header_bytes
+        return start, len(start) + offset
+
+    def save(self, path: str, source=None):
+        """Writes the table as a snapshot, atomically. `source` identifies the library it was read from."""
+
+        start, _ = self._snapshot_header(source)
+
+        def write(file):
+            file.write(start)
+            for array in self.arrays.values():
+                data = np.ascontiguousarray(array).tobytes()
+                file.write(data + b'\0'*(-len(data) % 8))
+
+        write_atomic(path, write, binary=True)
+
+    def snapshot_size(self) -> int:
+        """Returns the size of a snapshot of the table in bytes."""
+        return self._snapshot_header(None)[1]
+
+    def write_snapshot(self, buffer, source=None):
+        """Writes the table as a snapshot into a writable buffer of at least snapshot_size() bytes, e.g. shared memory."""
+
+        start, size = self._snapshot_header(source)
+        output = np.ndarray(size, dtype=np.uint8, buffer=buffer)
+        output[:len(start)] = np.frombuffer(start, dtype=np.uint8)
+        position = len(start)
+        for array in self.arrays.values():
+            output[position:position + array.nbytes] = np.ascontiguousarray(array).view(np.uint8)
+            position += -(-array.nbytes//8)*8
+
+    @classmethod
+    def open(cls, path: str) -> tuple:
+        """Memory-maps a snapshot. Returns the table and the source it was read from.
+
+        Raises ValueError if the file is not a snapshot of the current version.
+        """
+
+        with open(path, 'rb') as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return cls.from_buffer(buffer)
+        except ValueError as error:
+            raise ValueError(f'{path} is not a valid snapshot!') from error
+
+    @classmethod
+    def from_buffer(cls, buffer) -> tuple:
+        """Reads a table from a snapshot in a buffer without copying it. Returns the table and the source it was read from.
+
+        Raises ValueError if the buffer does not hold a snapshot of the current version.
+        """
+
+        try:
+            header, start = cls.read_header(buffer)
+            arrays = {name: np.frombuffer(buffer, dtype=spec['dtype'], count=spec['length'], offset=start + spec['offset'])
+                      for name, spec in header['arrays'].items()}
+        except (ValueError, KeyError, TypeError) as error:
+            raise ValueError('Not a valid snapshot!') from error
+        return cls(arrays, buffer), header['source']
+
+    @staticmethod
+    def read_header(buffer) -> tuple:
+        """Returns the header of a snapshot in a buffer and the offset of its arrays."""
+
+        if bytes(buffer[:8]) != SNAPSHOT_MAGIC:
+            raise ValueError('Not a snapshot!')
+        header_size, = struct.unpack('<Q', buffer[8:16])
+        header = json.loads(bytes(buffer[16:16 + header_size]))
+        if header.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f'Unsupported snapshot version: {header.get("version")}')
+        return header, 16 + header_size
+
+    def __len__(self):
+        return len(self.arrays['category'])
+
+    def __iter__(self):
+        return iter(self.reagents)
+
+    def __contains__(self, name):
+        return self.index(name) is not None
+
+    def entry(self, position: int) -> dict:
+        """Returns the reagent entry at a position, in the library.json format."""
+
+        reagent = {'name': self._names[position].decode('utf-8')}
+        category = int(self.arrays['category'][position])
+        if category >= 0:
+            reagent['category'] = CATEGORIES[category]
+        for key in PROPERTIES:
+            value = float(self.arrays[key][position])
+            if value == value:  # Not NaN
+                reagent[key] = int(value) if value.is_integer() else value
+        if self.arrays['has image'][position]:
+            reagent['image'] = self._images[position].decode('utf-8')
+        extras = self._extras[position]
+        if extras:
+            reagent.update(json.loads(extras))
+        return reagent
+
+    def index(self, name: str):
+        """Returns the position of the reagent in the table or None if it is unknown."""
+
+        key = normalize_name(name).encode('utf-8')
+        slots = self._slots
+        mask = len(slots) - 1
+        slot = zlib.crc32(key) & mask
+        while True:
+            position = slots[slot]
+            if position < 0:
+                return None
+            if self._keys[position] == key:
+                return position
+            slot = (slot + 1) & mask
+
+    def get(self, name: str):
+        """Returns the reagent entry or None if it is unknown."""
+        position = self.index(name)
+        return None if position is None else self.entry(position)
+
+    def positions(self, names, missing: int = None) -> np.ndarray:
+        """Returns the table positions for an array of reagent names or table indices, see ReagentRegistry.positions."""
+        return lookup_positions(names, self.index, len(self), missing)
+
+    def columns(self) -> dict:
+        """Returns the reagent properties as NumPy columns, see ReagentRegistry.columns."""
+        return {key: self.arrays[key] for key in ('category',) + PROPERTIES}
+
+    def factor_columns(self) -> tuple:
+        return self.arrays['mols per unit'], self.arrays['units per mol']
+
+    def names(self) -> list:
+        return self._names.decode_all()
+
+    def unit(self, name: str):
+        """Returns the unit the reagent is measured in ('g' for solids, 'mL' otherwise) or None if it is unknown."""
+        position = self.index(name)
+        if position is None:
+            return None
+        return 'g' if self.arrays['category'][position] == CATEGORIES.index('solid') else 'mL'
+
+    def _factor(self, key, name):
+        position = self.index(name)
+        if position is None:
+            return None
+        value = float(self.arrays[key][position])
+        return None if value != value else value
+
+    def mols_per_unit(self, name: str):
+        return self._factor('mols per unit', name)
+
+    def units_per_mol(self, name: str):
+        return self._factor('units per mol', name)
+
+def snapshot_path(path: str) -> str:
+    return f'{path}.snapshot'
+
+def _source(store: ReagentStore) -> list:
+    """Identifies the current version of a library by the size and modification time of its files."""
+    return [file_signature(store.path), file_signature(store.journal_path)]
+
+def load_table(path: str = None) -> ReagentTable:
+    """Opens the snapshot of a library (library.json next to this module by default).
+
+    If the snapshot is missing, of another version or older than the library, the library is read
+    and the snapshot is written again. If it cannot be written (e.g. on a read-only drive), the table
+    is kept in memory only.
+    """
+
+    store = ReagentStore(path or DEFAULT_LIBRARY_PATH)
+    source = _source(store)
+    try:
+        table, snapshot_source = ReagentTable.open(snapshot_path(store.path))
+        if snapshot_source == source:
+            return table
+    except (OSError, ValueError):
+        pass
+
+    # The source is taken before reading, so that a change during the read regenerates the snapshot next time
+    table = ReagentTable.from_reagents(store.load())
+    try:
+        table.save(snapshot_path(store.path), source)
+    except OSError:
+        pass
+    return table
+
+instrument.register(sys.modules[__name__], 'load_table')
@@ -0,0 +1,103 @@
+"""Background tasks for the GUI.
+
+Tk may only be used from the thread running its mainloop. TaskRunner runs blocking jobs (reading
+images, saving or reading the library) in worker threads and hands their results to callbacks on
+the Tk thread, by polling a queue with `after` while any task is pending.
+
+A task can be submitted with a key: submitting another task with the same key cancels the first one,
+so e.g. quickly changing the selected reagent only shows the last selected image.
+"""
+
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+POLL_INTERVAL = 15  # ms
+
+class Task:
+    def __init__(self, key, on_done, on_error):
+        self.key = key
+        self.on_done = on_done
+        self.on_error = on_error
+        self.cancelled = False
+        self.future = None
+
+    def cancel(self):
+        """Prevents the callbacks from being called, and the job from being run if it has not started yet."""
+
+        self.cancelled = True
+        if self.future is not None:
+            self.future.cancel()
+
+class TaskRunner:
+    def __init__(self, widget, max_workers: int = 4):
+        self.widget = widget
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='gui-task')
+        self._finished = queue.SimpleQueue()
+        self._tasks = {}  # Key -> latest task submitted with it
+        self._pending = 0  # Tasks whose results were not handed over yet
+        self._poll_id = None
+        self._closed = False
+
+    def submit(self, function, *args, on_done=None, on_error=None, key=None) -> Task:
+        """Runs function(*args) in a worker thread.
+
+        On the Tk thread, on_done is then called with the result, or on_error with the exception the
+        function raised (which is raised again without on_error). A task with the same key as an earlier
+        one cancels that one.
+        """
+
+        if key is not None:
+            self.cancel(key)
+        task = Task(key, on_done, on_error)
+        if key is not None:
+            self._tasks[key] = task
+        self._pending += 1
+        task.future = self._executor.submit(function, *args)
+        # Called in the worker thread when the job finished, or right away if it was cancelled before it started
+        task.future.add_done_callback(lambda future: self._finished.put(task))
+        if self._poll_id is None:
+            self._poll_id = self.widget.after(POLL_INTERVAL, self._poll)
+        return task
+
+    def cancel(self, key):
+        """Cancels the task submitted with a key, if it has not finished yet."""
+
+        task = self._tasks.pop(key, None)
+        if task is not None:
+            task.cancel()
+
+    def _poll(self):
+        self._poll_id = None
+        try:
+            while True:
+                try:
+                    task = self._finished.get_nowait()
+                except queue.Empty:
+                    break
+                self._pending -= 1
+                if task.cancelled:
+                    continue
+                if task.key is not None and self._tasks.get(task.key) is task:
+                    del self._tasks[task.key]
+                error = task.future.exception()
+                if error is None:
+                    if task.on_done is not None:
+                        task.on_done(task.future.result())
+                elif task.on_error is not None:
+                    task.on_error(error)
+                else:
+                    raise error
+        finally:
+            if self._pending > 0 and not self._closed:
+                self._poll_id = self.widget.after(POLL_INTERVAL, self._poll)
+
+    def shutdown(self):
+        """Cancels all waiting tasks. Running jobs (e.g. a save) are finished, but their callbacks are not called."""
+
+        self._closed = True
+        for task in list(self._tasks.values()):
+            task.cancel()
+        if self._poll_id is not None:
+            self.widget.after_cancel(self._poll_id)
+            self._poll_id = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,13 @@
+from bench_equivalents import compare, synthetic_library
+from core import CalculatorModel, ReagentRegistry
+
+def test_synthetic_library():
+    """Verifies that every synthetic reagent can be converted."""
+    model = CalculatorModel(ReagentRegistry(synthetic_library(100)))
+    assert all(model.to_mols(f'reagent {i}', 1) > 0 for i in range(100))
+
+def test_compare():
+    """Verifies that only benchmarks slower than the tolerance allows are reported."""
+    baseline = {'results': {'fast': {'seconds': 1.0}, 'slow': {'seconds': 1.0}}}
+    report = {'results': {'fast': {'seconds': 1.1}, 'slow': {'seconds': 2.0}, 'new': {'seconds': 5.0}}}
+    assert compare(report, baseline, 1.25) == [('slow', 1.0, 2.0, 2.0)]
@@ -0,0 +1,49 @@
+import io
+import os
+import sys
+import json
+import subprocess
+from cli import read_setups, calculate_setups, JSONLWriter
+from core import CalculatorModel, ReagentRegistry
+
+def test_csv_setups(model):
+    """Verifies that every CSV row produces a result or an error, in input order."""
+    file = io.StringIO('caffeine,1.5,pyridine,2,2M HCl,1.1\n\nacetone,x,pyridine,1\nunknown,1,pyridine,1\n')
+    output = io.StringIO()
+    writer = JSONLWriter(output, model)
+    for row in calculate_setups(read_setups(file, 'csv'), model):
+        writer.write(*row)
+    rows = [json.loads(line) for line in output.getvalue().splitlines()]
+
+    assert [row['line'] for row in rows] == [1, 3, 4]
+    assert rows[0]['reagents'][0]['amount'] == model.from_mols('pyridine', 2*model.to_mols('caffeine', 1.5))
+    assert 'error' in rows[1] and rows[2]['error'] == 'Unknown reagent: unknown'
+
+def test_invalid_numbers(model):
+    """Verifies that numbers out of range, NaN and infinity are reported per row instead of stopping the run."""
+    file = io.StringIO('{"limiting reagent": "caffeine", "amount": 1%s}\n{"limiting reagent": "caffeine", "amount": NaN}\n{"limiting reagent": "caffeine", "amount": 1}\n' % ('0'*400))
+    rows = list(calculate_setups(read_setups(file, 'jsonl'), model))
+    assert [row[3] is not None for row in rows] == [True, True, False]
+
+    rows = list(calculate_setups(read_setups(io.StringIO('caffeine,nan\ncaffeine,1,pyridine,inf\ncaffeine,1e300,pyridine,1e300\n'), 'csv'), model))
+    assert all(row[3] is not None for row in rows)
+    assert rows[2][3] == 'Result out of range!'
+
+def test_incomplete_entry(caffeine):
+    """Verifies that a reagent with an incomplete library entry is reported as such, not as unknown."""
+    model = CalculatorModel(ReagentRegistry([caffeine, {'name': 'acetone', 'category': 'liquid', 'molar mass': 58.08}]))
+    rows = list(calculate_setups(read_setups(io.StringIO('caffeine,1,acetone,2\nacetone,1\ncaffeine,1,unknown,1\n'), 'csv'), model))
+    assert [row[3] for row in rows] == ['Incomplete library entry', 'Incomplete library entry', 'Unknown reagent: unknown']
+
+def test_deeply_nested_json(model):
+    """Verifies that a JSON line nested too deeply is reported as a row error instead of stopping the run."""
+    file = io.StringIO('[' * 100000 + '\n{"limiting reagent": "caffeine", "amount": 1}\n')
+    rows = list(calculate_setups(read_setups(file, 'jsonl'), model))
+    assert [(row[0], row[3]) for row in rows] == [(1, 'Invalid record!'), (2, None)]
+
+def test_no_gui_imports(library):
+    """Verifies that the CLI runs without importing tkinter or Pillow."""
+    code = 'import sys, cli; cli.main(["--library", %r]); print(sorted({m.split(".")[0] for m in sys.modules} & {"tkinter", "PIL"}), file=sys.stderr)' % library
+    result = subprocess.run([sys.executable, '-c', code], input='caffeine,1,pyridine,2\n', cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+    assert json.loads(result.stdout)['reagents'][0]['name'] == 'pyridine'
+    assert result.stderr.strip() == '[]'
@@ -1,8 +1,14 @@
-from equivalents import CalculatorModel
+import os
+import sys
+import json
+import subprocess
+import pytest
+from equivalents import CalculatorModel, ReagentRegistry
 
-model = CalculatorModel()
+# Import time of the calculation core in seconds, measured at about 20 ms
+IMPORT_TIME_BUDGET = 0.1
 
-def test_to_mols():
+def test_to_mols(model):
     """Verifies if the output is correct."""
     # solids
     assert round(model.to_mols('tetracycline', 1.75), 5) == 0.00394
@@ -13,7 +19,7 @@ def test_to_mols():
     # solution mol/L
     assert model.to_mols('2M HCl', 15) == 0.03
     
-def test_from_mols():
+def test_from_mols(model):
     """Verifies if the output is correct."""
     # solids
     assert model.from_mols('L-lysine hydrochloride', 0.002) == 0.3653
@@ -22,4 +28,44 @@ def test_from_mols():
     # solution %
     assert round(model.from_mols('formalin', 0.003), 5) ==  0.24108
     # solution mol/L
-    assert model.from_mols('1M H2SO4', 0.0035) == 3.5
\ No newline at end of file
+    assert model.from_mols('1M H2SO4', 0.0035) == 3.5
+
+def test_registry_lookup():
+    """Verifies that reagents are found by normalized name and stay in sync after adding."""
+    registry = ReagentRegistry([{'name': 'Acetic acid', 'category': 'liquid', 'molar mass': 60.05, 'density': 1.05}])
+    assert registry.get('  acetic   ACID ')['name'] == 'Acetic acid'
+    assert registry.unit('Acetic acid') == 'mL'
+    assert registry.get('sodium chloride') is None
+
+    registry.add({'name': 'sodium chloride', 'category': 'solid', 'molar mass': 58.44, 'image': ''})
+    assert registry.unit('sodium chloride') == 'g'
+    assert CalculatorModel(registry).from_mols('sodium chloride', 0.5) == 29.22
+
+def test_batch_matches_scalar(model):
+    """Verifies that the batch conversions give the same results as the scalar ones."""
+    names = model.registry.names()*3
+    amounts = [0.5 + i for i in range(len(names))]
+    to_mols = model.to_mols_batch(names, amounts)
+    indices = list(range(len(model.registry)))[::-1]
+    from_mols = model.from_mols_batch(indices, amounts[:len(indices)])
+    assert list(to_mols) == [model.to_mols(name, amount) for name, amount in zip(names, amounts)]
+    assert list(from_mols) == [model.from_mols(names[i], amount) for i, amount in zip(indices, amounts)]
+
+def test_batch_lengths(model):
+    """Verifies that names and amounts of different lengths are rejected instead of broadcast."""
+    with pytest.raises(ValueError):
+        model.to_mols_batch(['caffeine'], [1, 2, 3])
+    with pytest.raises(ValueError):
+        model.from_mols_batch(['caffeine', 'pyridine'], [1, 2, 3])
+
+def test_import_is_fast_and_side_effect_free():
+    """Verifies that importing the calculator loads neither the GUI libraries nor the library file, within the time budget."""
+    code = (
+        'import sys, time; start = time.perf_counter(); import equivalents; elapsed = time.perf_counter() - start; '
+        'import core, json; print(json.dumps([elapsed, sorted({m.split(".")[0] for m in sys.modules} & {"tkinter", "PIL", "numpy"}), core._registry is None]))'
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+    elapsed, gui_modules, library_not_loaded = json.loads(result.stdout)
+    assert gui_modules == []
+    assert library_not_loaded
+    assert elapsed < IMPORT_TIME_BUDGET
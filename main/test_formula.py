@@ -0,0 +1,18 @@
+import pytest
+from formula import composition, molar_mass
+
+def test_molar_mass():
+    """Verifies molar masses of formulas with hydrates, parentheses, brackets and group abbreviations."""
+    assert round(molar_mass('C8H10N4O2'), 2) == 194.19
+    assert round(molar_mass('C8H10N4O2·H2O'), 2) == 212.21
+    assert round(molar_mass('NaBH(OAc)3'), 2) == 211.94
+    assert molar_mass('CuSO4.5H2O') == molar_mass('CuSO4*5H2O') == molar_mass('CuSO₄·5H₂O')
+    assert composition('K4[Fe(CN)6]·3H2O') == {'K': 4, 'Fe': 1, 'C': 6, 'N': 6, 'H': 6, 'O': 3}
+    assert composition('CaSO4·0.5H2O') == {'Ca': 1, 'S': 1, 'O': 4.5, 'H': 1}
+    assert composition('Et3N') == {'C': 6, 'H': 15, 'N': 1}
+
+@pytest.mark.parametrize('formula', ['', 'Xy2', 'C6(H', 'H2O)', '2', 'NaCl-'])
+def test_invalid_formula(formula):
+    """Verifies that invalid formulas raise ValueError."""
+    with pytest.raises(ValueError):
+        molar_mass(formula)
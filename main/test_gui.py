@@ -0,0 +1,157 @@
+import pytest
+from types import SimpleNamespace
+
+pytest.importorskip('tkinter')
+pytest.importorskip('PIL')
+
+import gui
+from gui import REAGENT_LABELS, CalculatorController, CalculatorFrame, result_line
+
+class FakeParent:
+    """Stands in for the Tk root: callbacks scheduled with after are only recorded."""
+
+    def __init__(self):
+        self.scheduled = {}
+        self.last_id = 0
+
+    def after(self, ms, callback):
+        self.last_id += 1
+        self.scheduled[self.last_id] = callback
+        return self.last_id
+
+    def after_cancel(self, after_id):
+        self.scheduled.pop(after_id, None)
+
+class FakeWidget:
+    """Stands in for Tk variables, entries and labels: get returns the value, config records the options."""
+
+    def __init__(self, value=''):
+        self.value = value
+        self.options = {}
+        self.position = None
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+    def config(self, **options):
+        self.options.update(options)
+
+    configure = config
+
+    def grid(self, row, column):
+        self.position = row, column
+
+    def grid_remove(self):
+        self.position = None
+
+def make_controller(model, num_of_reagents=2):
+    """Returns a CalculatorController with fake widgets instead of a CalculatorFrame and no Tk root."""
+
+    controller = CalculatorController.__new__(CalculatorController)
+    controller.parent = FakeParent()
+    controller.model = model
+    controller.num_of_reagents = FakeWidget(num_of_reagents)
+    controller._pending_recalculation = None
+    controller._dirty_rows = set()
+    controller._results_header = None
+    controller._mols_of_A = None
+    controller._result_rows = {}
+    controller.frame = SimpleNamespace(
+        reagent_vars={i: FakeWidget() for i in range(5)},
+        reagent_entries={i: FakeWidget() for i in range(5)},
+        reagent_labels={i: FakeWidget() for i in range(5)},
+        unit_labels={i: FakeWidget() for i in range(5)},
+        results_label=FakeWidget(),
+    )
+    return controller
+
+def test_import():
+    """Verifies that the GUI module compiles and imports with this Python version."""
+    assert gui.CalculatorApp
+
+def test_missing_image(model):
+    """Verifies that a missing image file brings back the label text instead of keeping the image of the previous reagent."""
+    controller = make_controller(model)
+    label = controller.frame.reagent_labels[1]
+    label.config(image='acetone', text='')
+    controller.image_failed(1, FileNotFoundError('caffeine.png'))
+    assert label.options == {'image': '', 'text': REAGENT_LABELS[1]}
+
+    with pytest.raises(TypeError):  # Not an I/O error
+        controller.image_failed(1, TypeError())
+
+def enter(controller, index, name, amount):
+    controller.frame.reagent_vars[index].set(name)
+    controller.frame.reagent_entries[index].set(amount)
+    controller.input_changed(index)
+
+def test_recalculate_edited_rows(model, monkeypatch):
+    """Verifies that typing schedules one recalculation and that only the edited rows are calculated again."""
+    controller = make_controller(model, num_of_reagents=3)
+    enter(controller, 0, 'caffeine', '1.5')
+    enter(controller, 1, 'pyridine', '2')
+    enter(controller, 2, '2M HCl', '1.1')
+    assert list(controller.parent.scheduled.values()) == [controller.recalculate]
+    assert controller.frame.unit_labels[0].options['text'] == 'g'
+
+    controller.recalculate()
+    mols_of_A = model.to_mols('caffeine', 1.5)
+    pyridine = result_line('pyridine', 2.0, model.from_mols('pyridine', 2*mols_of_A), 'mL')
+    hcl = result_line('2M HCl', 1.1, model.from_mols('2M HCl', 1.1*mols_of_A), 'mL')
+    assert controller.frame.results_label.options['text'] == 'For 1.5 g of caffeine, measure:\n' + pyridine + hcl
+
+    calculated = []
+    calculate_row = controller.calculate_row
+    monkeypatch.setattr(controller, 'calculate_row', lambda index: calculated.append(index) or calculate_row(index))
+    enter(controller, 2, '2M HCl', '3')
+    controller.recalculate()
+    assert calculated == [2]
+    assert controller.frame.results_label.options['text'].startswith('For 1.5 g of caffeine, measure:\n' + pyridine)
+
+    enter(controller, 0, 'caffeine', '3')
+    controller.recalculate()
+    assert sorted(calculated) == [1, 2, 2]
+
+def test_recalculate_incomplete_input(model):
+    """Verifies that incomplete rows are left out and that no results are shown without an amount of A."""
+    controller = make_controller(model)
+    enter(controller, 0, 'caffeine', '1')
+    enter(controller, 1, 'pyridine', 'x')
+    controller.recalculate()
+    assert controller.frame.results_label.options['text'] == 'For 1.0 g of caffeine, measure:\n'
+
+    enter(controller, 0, 'caffeine', '')
+    controller.recalculate()
+    assert controller.frame.results_label.options['text'] == ''
+
+def test_reaction_scheme_reuses_slots(monkeypatch):
+    """Verifies that slots are created once and afterwards only shown or hidden, in their columns."""
+    monkeypatch.setattr(gui.tk, 'StringVar', FakeWidget)
+    frame = CalculatorFrame.__new__(CalculatorFrame)
+    frame.controller = SimpleNamespace(num_of_reagents=FakeWidget(3))
+    frame.reagent_vars, frame.slot_frames, frame.plus_frames, frame.products_label = {}, [], [], FakeWidget()
+    created = []
+    frame.create_frame_type_A = lambda *args: created.append('slot') or FakeWidget()
+    frame.create_frame_type_B = lambda *args: created.append('+') or FakeWidget()
+
+    frame.create_reaction_scheme(None)
+    slots = list(frame.slot_frames)
+    assert created == ['slot', '+', 'slot', '+', 'slot']
+    assert [slot.position for slot in slots] == [(0, 0), (0, 2), (0, 4)]
+    assert [plus.position for plus in frame.plus_frames] == [(0, 1), (0, 3)]
+    assert frame.products_label.position == (0, 5)
+
+    frame.controller.num_of_reagents.set(2)
+    frame.create_reaction_scheme(None)
+    assert len(created) == 5 and frame.slot_frames == slots
+    assert [slot.position for slot in slots] == [(0, 0), (0, 2), None]
+    assert frame.plus_frames[1].position is None and frame.products_label.position == (0, 3)
+
+    frame.controller.num_of_reagents.set(4)
+    frame.create_reaction_scheme(None)
+    assert created[5:] == ['+', 'slot'] and frame.slot_frames[:3] == slots
+    assert [slot.position for slot in frame.slot_frames] == [(0, 0), (0, 2), (0, 4), (0, 6)]
+    assert frame.products_label.position == (0, 7)
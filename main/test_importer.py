@@ -0,0 +1,22 @@
+from importer import import_reagents
+from store import ReagentStore
+
+def test_import_csv(tmp_path, caffeine, write_library):
+    """Verifies that valid rows are added in one write and invalid or duplicate rows are reported by line."""
+    library = tmp_path / 'library.json'
+    write_library(library, [caffeine])
+    catalog = tmp_path / 'catalog.csv'
+    catalog.write_text('Name,Category,Molecular Formula,Density,MW\n'
+                       'STAB,,NaBH(OAc)3,,\n'
+                       'triethylamine,liquid,Et3N,0.73,\n'
+                       'Caffeine,solid,,,194.19\n'
+                       'acetone,liquid,C3H6O,,\n'
+                       'mystery,solid,Xy2,,\n'
+                       'endless,solid,,,inf\n'
+                       'weightless,liquid,,1e999,10\n', encoding='utf-8')
+
+    added, errors = import_reagents(str(catalog), str(library), jobs=1)
+    assert [reagent['name'] for reagent in added] == ['STAB', 'triethylamine']
+    assert added[0]['molar mass'] == 211.94 and added[0]['formula'] == 'NaBH(OAc)3'
+    assert [line_num for line_num, _ in errors] == [4, 5, 6, 7, 8]
+    assert [reagent['name'] for reagent in ReagentStore(str(library)).load()] == ['caffeine', 'STAB', 'triethylamine']
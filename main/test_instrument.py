@@ -0,0 +1,20 @@
+import instrument
+from core import CalculatorModel, ReagentRegistry
+
+def test_instrumentation_is_opt_in():
+    """Verifies that model calls are only wrapped and timed while instrumentation is enabled."""
+    original = CalculatorModel.to_mols
+    model = CalculatorModel(ReagentRegistry([{'name': 'NaCl', 'category': 'solid', 'molar mass': 58.44, 'image': ''}]))
+    try:
+        instrument.reset()
+        instrument.enable(dump_at_exit=False)
+        assert CalculatorModel.to_mols is not original
+        for _ in range(3):
+            assert abs(model.to_mols('NaCl', 58.44) - 1) < 1e-9
+    finally:
+        instrument.disable()
+    assert CalculatorModel.to_mols is original
+
+    stats = instrument.snapshot()['metrics']['CalculatorModel.to_mols']
+    assert stats['count'] == 3 and sum(stats['histogram'].values()) == 3
+    assert 0 < stats['p50 s'] and stats['p99 s'] <= stats['max s']
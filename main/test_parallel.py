@@ -0,0 +1,35 @@
+import io
+import json
+import pytest
+from cli import CSVWriter, calculate_setups, read_setups
+from core import CalculatorModel
+from parallel import calculate_file
+from table import ReagentTable
+
+@pytest.fixture(scope='module')
+def table(model):
+    return ReagentTable.from_reagents(list(model.registry.reagents))
+
+def test_calculate_file(table):
+    """Verifies that the workers write the same output as a serial run, in input order and with the failing rows."""
+    text = ''.join(f'caffeine,{i + 1},pyridine,2,2M HCl,1.1\nacetone,x\nunknown,1\n\n' for i in range(50))
+
+    model = CalculatorModel(table)
+    expected = io.StringIO()
+    CSVWriter.write_header(expected)
+    writer = CSVWriter(expected, model)
+    for row in calculate_setups(read_setups(io.StringIO(text), 'csv'), model):
+        writer.write(*row)
+
+    output = io.StringIO()
+    assert calculate_file(io.StringIO(text), 'csv', output, 'csv', table, jobs=2, chunk_size=7)
+    assert output.getvalue() == expected.getvalue()
+
+def test_deeply_nested_json(table):
+    """Verifies that a JSON line nested too deeply fails only its own row in a worker."""
+    text = '[' * 100000 + '\n{"limiting reagent": "caffeine", "amount": 1}\n'
+    output = io.StringIO()
+    assert calculate_file(io.StringIO(text), 'jsonl', output, 'jsonl', table, jobs=2)
+    rows = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert rows[0] == {'line': 1, 'error': 'Invalid record!'}
+    assert rows[1]['limiting reagent'] == 'caffeine'
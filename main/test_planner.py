@@ -0,0 +1,19 @@
+import math
+from planner import plan_campaign
+
+def test_plan_campaign(model):
+    """Verifies that the totals equal the sums of the per-reaction results and that failing reactions are left out."""
+    setups = [
+        ('caffeine', 1.5, [('pyridine', 2), ('2M HCl', 1.1)]),
+        ('acetone', 2, [('pyridine', 1), ('caffeine', 0.5), ('formalin', 3), ('triethylamine', 1.2), ('1M H2SO4', 0.1)]),
+        ('caffeine', 1, [('unknown', 1)]),
+    ]
+    plan, errors = plan_campaign(setups, model)
+    totals = {name: (total, unit, count) for name, total, unit, count in plan}
+
+    expected_pyridine = sum(amount for setup in setups[:2] for name, _, amount, _ in model.calculate(*setup) if name == 'pyridine')
+    assert math.isclose(totals['pyridine'][0], expected_pyridine)
+    assert totals['pyridine'][1:] == ('mL', 2)
+    assert math.isclose(totals['caffeine'][0], 1.5 + model.calculate(*setups[1])[1][2])
+    assert totals['caffeine'][1] == 'g'
+    assert errors == [(2, 'Unknown reagent: unknown')]
@@ -0,0 +1,29 @@
+from core import ReagentRegistry
+from search import ReagentSearchIndex
+
+def make_registry():
+    return ReagentRegistry([
+        {'name': 'triethylamine', 'category': 'liquid', 'molar mass': 101.19, 'density': 0.73, 'synonyms': ['TEA', 'Et3N']},
+        {'name': 'pyridine', 'category': 'liquid', 'molar mass': 79.1, 'density': 0.98},
+        {'name': '2M HCl', 'category': 'molar solution', 'molar mass': 36.46, 'solution concentration': 2},
+        {'name': 'triethyl orthoformate', 'category': 'liquid', 'molar mass': 148.2, 'density': 0.89},
+    ])
+
+def test_search():
+    """Verifies prefix, word, synonym and fuzzy matches and their order."""
+    index = ReagentSearchIndex(make_registry())
+    assert index.search('Triethyl') == ['triethyl orthoformate', 'triethylamine']
+    assert index.search('hcl') == ['2M HCl']
+    assert index.search('et3n') == ['triethylamine']
+    assert index.search('pyridien')[0] == 'pyridine'
+    assert index.search('', limit=2) == ['triethylamine', 'pyridine']
+
+def test_search_follows_registry():
+    """Verifies that the index picks up added, changed and removed reagents."""
+    registry = make_registry()
+    index = ReagentSearchIndex(registry)
+    registry.add({'name': 'pyrrolidine', 'category': 'liquid', 'molar mass': 71.12, 'density': 0.87})
+    assert index.search('pyr') == ['pyridine', 'pyrrolidine']
+
+    registry.merge([{'name': 'pyrrolidine', 'category': 'liquid', 'molar mass': 71.12, 'density': 0.87}])
+    assert index.search('pyr') == ['pyrrolidine']
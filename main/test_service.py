@@ -0,0 +1,107 @@
+import json
+import asyncio
+import service as service_module
+from core import load_library
+from service import CalculatorService, serve, watch_library
+from watcher import LibraryWatcher
+from loadtest import make_request
+
+def test_handle(model, caffeine):
+    """Verifies the responses of the endpoints, including batched and failing requests."""
+    service = CalculatorService(model)
+    status, response = service.handle('POST', '/to_mols', json.dumps({'reagents': ['2M HCl', 'caffeine'], 'amounts': [15, 1.5]}).encode())
+    assert status == 200 and response['mols'] == [service.model.to_mols('2M HCl', 15), service.model.to_mols('caffeine', 1.5)]
+
+    status, response = service.handle('POST', '/from_mols', json.dumps({'reagents': ['1M H2SO4'], 'mols': [0.0035]}).encode())
+    assert status == 200 and response == {'amounts': [3.5], 'units': ['mL']}
+
+    setups = [{'limiting reagent': 'caffeine', 'amount': 1.5, 'reagents': [['pyridine', 2]]}, {'limiting reagent': 'unknown', 'amount': 1}]
+    status, response = service.handle('POST', '/calculate', json.dumps(setups).encode())
+    assert status == 200
+    assert response[0]['reagents'][0]['amount'] == service.model.from_mols('pyridine', 2*service.model.to_mols('caffeine', 1.5))
+    assert response[1] == {'error': 'Unknown reagent: unknown'}
+
+    assert service.handle('POST', '/to_mols', b'{"reagents": ["unknown"], "amounts": [1]}')[0] == 400
+    assert service.handle('POST', '/to_mols', b'{"reagents": [{"a": 1}, "caffeine"], "amounts": [1, 2]}')[0] == 400
+    assert service.handle('POST', '/to_mols', b'{"reagents": ["caffeine", 0], "amounts": [1, 2]}') == (400, {'error': 'Reagents must be all names or all registry indices!'})
+    assert service.handle('POST', '/to_mols', b'{"reagents": [0, 1], "amounts": [1, 2]}')[0] == 200
+    assert service.handle('POST', '/from_mols', b'{"reagents": ["caffeine"], "mols": ["1"]}')[0] == 400
+    assert service.handle('POST', '/to_mols', b'{"reagents": ["caffeine"], "amounts": [1%s]}' % (b'0'*400))[0] == 400
+    assert service.handle('POST', '/to_mols', b'{"reagents": ["caffeine"], "amounts": [NaN]}')[0] == 400
+    assert service.handle('POST', '/to_mols', b'[' * 100000)[0] == 400
+    assert service.handle('POST', '/from_mols', b'{"reagents": ["caffeine"], "mols": [1e307]}')[1]['amounts'] == [None]
+    assert service.handle('POST', '/max_scale', b'{"reactions": [{"limiting reagent": "caffeine", "reagents": 5}], "inventory": {}}')[0] == 400
+    assert service.handle('POST', '/max_scale', b'{"reactions": [{"limiting reagent": "caffeine"}], "inventory": {"caffeine": null}}')[0] == 400
+    assert service.handle('POST', '/max_scale', b'{"reactions": [{"limiting reagent": "caffeine"}], "inventory": {"caffeine": -5}}')[0] == 400
+    status, response = service.handle('POST', '/max_scale', b'{"reactions": [{"limiting reagent": "caffeine", "reagents": [["pyridine", 2]]}], "inventory": {"caffeine": 1, "pyridine": 10}}')
+    assert status == 200 and response['results'][0]['binding reagent'] == 'caffeine'
+    assert service.handle('GET', '/calculate', b'')[0] == 405
+    assert service.handle('GET', '/nowhere', b'')[0] == 404
+
+def test_keep_alive_connection(caffeine, acetone):
+    """Verifies that several requests are answered over one connection."""
+
+    async def run():
+        started = asyncio.get_running_loop().create_future()
+        task = asyncio.create_task(serve(port=0, ready=started.set_result))
+        server = await started
+        port = server.sockets[0].getsockname()[1]
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        request = make_request('127.0.0.1', '/calculate', {'limiting reagent': 'caffeine', 'amount': 1, 'reagents': [['acetone', 1]]})
+        responses = []
+        for _ in range(2):
+            writer.write(request)
+            headers = (await reader.readuntil(b'\r\n\r\n')).decode()
+            length = int(headers.lower().split('content-length:')[1].split()[0])
+            responses.append(json.loads(await reader.readexactly(length)))
+        writer.close()
+        task.cancel()
+        return headers, responses
+
+    headers, responses = asyncio.run(run())
+    assert headers.startswith('HTTP/1.1 200') and 'keep-alive' in headers
+    assert responses[0] == responses[1] and responses[0]['reagents'][0]['unit'] == 'mL'
+
+def test_watch_malformed_entry(tmp_path, monkeypatch, capsys, caffeine, acetone, write_library):
+    """Verifies that a malformed entry is logged once and the library is still watched."""
+    path = str(tmp_path / 'library.json')
+    write_library(path, [caffeine])
+    registry = load_library(path)
+    watcher = LibraryWatcher(registry, path)
+    monkeypatch.setattr(service_module, 'LIBRARY_POLL_INTERVAL', 0.01)
+
+    async def run():
+        task = asyncio.create_task(watch_library(watcher))
+        write_library(path, [caffeine, dict(acetone, name=5)])
+        await asyncio.sleep(0.1)
+        write_library(path, [caffeine, acetone])
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if registry.get('acetone') is not None:
+                break
+        running = not task.done()
+        task.cancel()
+        return running
+
+    assert asyncio.run(run())
+    assert registry.names() == ['caffeine', 'acetone']
+    assert len(capsys.readouterr().err.splitlines()) == 1
+
+def test_long_header():
+    """Verifies that a header line longer than the stream limit is answered with 431."""
+
+    async def run():
+        started = asyncio.get_running_loop().create_future()
+        task = asyncio.create_task(serve(port=0, ready=started.set_result))
+        server = await started
+        port = server.sockets[0].getsockname()[1]
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'GET /health HTTP/1.1\r\nX-Padding: ' + b'a'*100000 + b'\r\n\r\n')
+        response = await reader.read()
+        writer.close()
+        task.cancel()
+        return response
+
+    assert asyncio.run(run()).startswith(b'HTTP/1.1 431')
@@ -0,0 +1,66 @@
+import pytest
+import math
+from core import CalculatorModel, ReagentRegistry
+from solver import max_scales
+
+def test_max_scales(model):
+    """Verifies that the batched maximum scales match CalculatorModel.max_scale and that failing reactions are reported."""
+    inventory = {'caffeine': 10, 'pyridine': 5, '2M HCl': 100, 'acetone': 3, 'triethylamine': 0.5, 'unknown': 1}
+    setups = [
+        ('caffeine', [('pyridine', 2), ('2M HCl', 1.1)]),
+        ('acetone', [('pyridine', 0.1), ('caffeine', 0.01)]),
+        ('caffeine', [('triethylamine', 1), ('pyridine', 0.5)]),
+        ('caffeine', []),
+        ('caffeine', [('unknown', 1)]),
+        ('acetone', [('pyridine', 0)]),
+    ]
+    results, errors = max_scales(setups, inventory, model)
+
+    for setup, result in zip(setups[:4], results):
+        expected = model.max_scale(*setup, inventory)
+        assert math.isclose(result[0], expected[0]) and result[1:] == expected[1:]
+    assert [result[2] for result in results[:4]] == ['pyridine', 'acetone', 'triethylamine', 'caffeine']
+    assert results[4] is None and results[5] is None
+    assert errors == [(4, 'Unknown reagent: unknown'), (5, 'Invalid equivalents of pyridine')]
+
+    with pytest.raises(ValueError):
+        max_scales(setups, {'caffeine': -5}, model)
+    with pytest.raises(ValueError):
+        model.max_scale('caffeine', [], {'caffeine': -5})
+
+def test_max_scale(model):
+    """Verifies that the largest scale uses up the binding reagent exactly."""
+    amount, unit, binding = model.max_scale('caffeine', [('pyridine', 2), ('formalin', 1)], {'caffeine': 10, 'pyridine': 50})
+    assert (amount, unit, binding) == (0, 'g', 'formalin')
+
+    amount, unit, binding = model.max_scale('caffeine', [('pyridine', 2)], {'caffeine': 10, 'pyridine': 5})
+    assert binding == 'pyridine' and math.isclose(model.calculate('caffeine', amount, [('pyridine', 2)])[0][2], 5)
+
+def test_shared_stock(model):
+    """Verifies that the equivalents of a reagent listed more than once, or also as A, share its stock."""
+    inventory = {'caffeine': 10, 'pyridine': 5}
+    setups = [('caffeine', [('pyridine', 2), ('pyridine', 2)]), ('caffeine', [('caffeine', 1), ('pyridine', 0.001)])]
+    results, errors = max_scales(setups, inventory, model)
+    assert errors == []
+
+    for setup, result in zip(setups, results):
+        expected = model.max_scale(*setup, inventory)
+        assert math.isclose(result[0], expected[0]) and result[1:] == expected[1:]
+    assert [result[2] for result in results] == ['pyridine', 'caffeine']
+    assert math.isclose(results[0][0], model.max_scale('caffeine', [('pyridine', 4)], inventory)[0])
+    assert math.isclose(results[1][0], 5)
+
+    amount = results[0][0]
+    assert math.isclose(sum(result[2] for result in model.calculate('caffeine', amount, setups[0][1])), 5)
+
+def test_incomplete_entry(caffeine):
+    """Verifies that both solvers report a reagent with an incomplete library entry the same way."""
+    incomplete_model = CalculatorModel(ReagentRegistry([caffeine, {'name': 'acetone', 'category': 'liquid', 'molar mass': 58.08}]))
+    inventory = {'caffeine': 10, 'acetone': 5}
+    results, errors = max_scales([('caffeine', [('acetone', 1)]), ('acetone', [])], inventory, incomplete_model)
+    assert results == [None, None]
+    assert errors == [(0, 'Incomplete library entry'), (1, 'Incomplete library entry')]
+
+    for name_of_A, reagents in [('caffeine', [('acetone', 1)]), ('acetone', [])]:
+        with pytest.raises(ValueError, match='Incomplete library entry'):
+            incomplete_model.max_scale(name_of_A, reagents, inventory)
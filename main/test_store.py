@@ -0,0 +1,53 @@
+import json
+import threading
+from store import ReagentStore
+
+def test_append_and_compact(tmp_path, caffeine, acetone, write_library):
+    """Verifies that appended reagents are loaded from the journal and merged into library.json on compaction."""
+    path = write_library(tmp_path / 'library.json', [caffeine])
+    store = ReagentStore(path)
+    store.append(acetone)
+    assert [reagent['name'] for reagent in store.load()] == ['caffeine', 'acetone']
+
+    store.compact()
+    with open(path, encoding='utf-8') as file:
+        assert [reagent['name'] for reagent in json.load(file)] == ['caffeine', 'acetone']
+    assert [reagent['name'] for reagent in store.load()] == ['caffeine', 'acetone']
+
+def test_concurrent_writers(tmp_path, write_library):
+    """Verifies that no addition is lost when several writers append and compact at the same time."""
+    path = write_library(tmp_path / 'library.json', [])
+
+    def add(writer):
+        store = ReagentStore(path, compact_size=500)
+        for i in range(25):
+            store.append({'name': f'reagent {writer}-{i}', 'category': 'solid', 'molar mass': 100})
+
+    threads = [threading.Thread(target=add, args=(writer,)) for writer in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({reagent['name'] for reagent in ReagentStore(path).load()}) == 100
+
+def test_torn_and_stale_journal(tmp_path, caffeine, acetone, pyridine, write_library):
+    """Verifies that an incomplete last journal line is ignored and that a stale journal is not applied twice."""
+    path = write_library(tmp_path / 'library.json', [])
+    store = ReagentStore(path)
+    store.append(acetone)
+    with open(store.journal_path, 'a', encoding='utf-8') as file:
+        file.write('{"name": "pyri')
+    assert [reagent['name'] for reagent in store.load()] == ['acetone']
+    store.append(pyridine)
+    assert [reagent['name'] for reagent in store.load()] == ['acetone', 'pyridine']
+
+    # library.json edited by hand after the addition
+    write_library(tmp_path / 'library.json', [acetone, caffeine])
+    assert [reagent['name'] for reagent in store.load()] == ['acetone', 'caffeine', 'pyridine']
+
+def test_unlockable_library(tmp_path, caffeine, write_library):
+    """Verifies that a library whose lock file cannot be created (e.g. on a read-only mount) is still read."""
+    path = write_library(tmp_path / 'library.json', [caffeine])
+    store = ReagentStore(path)
+    (tmp_path / 'library.json.lock').mkdir()  # Opening it fails with an OSError other than PermissionError
+    assert [reagent['name'] for reagent in store.load()] == ['caffeine']
@@ -0,0 +1,33 @@
+import numpy as np
+from core import CalculatorModel, ReagentRegistry, load_library
+from store import ReagentStore
+from table import ReagentTable, load_table
+
+def test_table_matches_registry(library):
+    """Verifies that a table gives the same entries and results as a registry of the same library."""
+    reagents = load_library(library).reagents + [{'name': 'Caffeine', 'category': 'solid', 'molar mass': 1},
+                                                 {'name': 'unknown gas', 'category': 'gas', 'molar mass': 'n/a', 'synonyms': ['x']}]
+    registry, table = ReagentRegistry(reagents), ReagentTable.from_reagents(reagents)
+    for reagent in reagents:
+        name = reagent['name']
+        assert table.get(name) == registry.get(name)
+        assert (table.unit(name), table.mols_per_unit(name), table.units_per_mol(name)) == \
+               (registry.unit(name), registry.mols_per_unit(name), registry.units_per_mol(name))
+    assert table.index('no such reagent') is None
+
+    names = registry.names()
+    assert table.names() == names
+    assert np.array_equal(CalculatorModel(table).to_mols_batch(names, [1.0]*len(names)),
+                          CalculatorModel(registry).to_mols_batch(names, [1.0]*len(names)), equal_nan=True)
+
+def test_snapshot_is_regenerated(tmp_path, caffeine, acetone, write_library):
+    """Verifies that the snapshot is memory-mapped while current and rewritten after the library changed."""
+    path = write_library(tmp_path / 'library.json', [caffeine])
+    assert load_table(path).names() == ['caffeine']
+    assert (tmp_path / 'library.json.snapshot').exists()
+    assert load_table(path)._buffer is not None
+
+    ReagentStore(path).append(acetone)
+    table = load_table(path)
+    assert table._buffer is None and table.names() == ['caffeine', 'acetone']
+    assert load_table(path).get('Acetone')['density'] == 0.79
@@ -0,0 +1,51 @@
+import time
+import threading
+from tasks import TaskRunner
+
+class FakeWidget:
+    """Stands in for a Tk widget: callbacks scheduled with after are run by run_pending."""
+
+    def __init__(self):
+        self.scheduled = {}
+        self.last_id = 0
+
+    def after(self, ms, callback):
+        self.last_id += 1
+        self.scheduled[self.last_id] = callback
+        return self.last_id
+
+    def after_cancel(self, after_id):
+        self.scheduled.pop(after_id, None)
+
+    def run_pending(self, timeout=5):
+        deadline = time.monotonic() + timeout
+        while self.scheduled and time.monotonic() < deadline:
+            after_id = min(self.scheduled)
+            self.scheduled.pop(after_id)()
+            time.sleep(0.005)
+
+def test_results_are_delivered_on_the_polling_thread():
+    """Verifies that callbacks run in the thread polling the runner, and that a newer task with the same key cancels the older one."""
+    widget = FakeWidget()
+    runner = TaskRunner(widget, max_workers=1)
+    started = threading.Event()
+    release = threading.Event()
+    results, errors = [], []
+
+    def slow(value):
+        started.set()
+        release.wait(5)
+        return value
+
+    runner.submit(slow, 'blocking')
+    started.wait(5)
+    runner.submit(str, 'stale', key='image', on_done=results.append)  # Waits for the worker, then is cancelled
+    runner.submit(str, 'latest', key='image', on_done=lambda result: results.append((result, threading.current_thread())))
+    runner.submit(int, 'x', on_error=errors.append)
+    release.set()
+    widget.run_pending()
+
+    assert results == [('latest', threading.current_thread())]
+    assert isinstance(errors[0], ValueError)
+    assert not widget.scheduled
+    runner.shutdown()
@@ -0,0 +1,39 @@
+import os
+from PIL import Image
+import thumbnails
+from thumbnails import ThumbnailCache
+
+def test_thumbnail_cache(tmp_path, monkeypatch):
+    """Verifies that thumbnails are served from memory, then from disk, and rendered again when the image changes."""
+    image_path = str(tmp_path / 'reagent.png')
+    Image.new('RGB', (200, 100), 'white').save(image_path)
+    cache = ThumbnailCache(cache_dir=str(tmp_path / 'cache'), max_items=2)
+
+    thumbnail = cache.get(image_path, 80)
+    assert thumbnail.size == (160, 80)
+    assert cache.get(image_path, 80) is thumbnail
+
+    # A new cache reads the thumbnail from disk without rendering it
+    def fail(*args):
+        raise AssertionError('rendered again')
+    monkeypatch.setattr(thumbnails, 'resize_image', fail)
+    assert ThumbnailCache(cache_dir=str(tmp_path / 'cache')).get(image_path, 80).size == (160, 80)
+    monkeypatch.undo()
+
+    Image.new('RGB', (100, 100), 'white').save(image_path)
+    os.utime(image_path, ns=(0, os.stat(image_path).st_mtime_ns + 10**9))
+    assert cache.get(image_path, 80).size == (80, 80)
+
+def test_prewarm_most_used(tmp_path):
+    """Verifies that prewarming renders the most used images first."""
+    paths = []
+    for i in range(3):
+        paths.append(str(tmp_path / f'{i}.png'))
+        Image.new('RGB', (10, 10)).save(paths[-1])
+    cache = ThumbnailCache(cache_dir=str(tmp_path / 'cache'))
+    cache.record_use(paths[2])
+    cache.save_usage()
+
+    cache = ThumbnailCache(cache_dir=str(tmp_path / 'cache'))
+    cache.prewarm(paths, 20, limit=1).join()
+    assert [key[0] for key in cache._memory] == [os.path.abspath(paths[2])]
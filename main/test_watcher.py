@@ -0,0 +1,84 @@
+import os
+import pytest
+from core import CalculatorModel, ReagentRegistry, load_library
+from store import ReagentStore
+from watcher import LibraryWatcher
+
+def test_merge(caffeine, acetone, pyridine):
+    """Verifies that merging touches only the added, changed and removed reagents."""
+    registry = ReagentRegistry([caffeine, acetone])
+    dense_acetone = dict(acetone, density=0.8)
+    assert registry.merge([dense_acetone, pyridine]) == (['pyridine'], ['acetone'], ['caffeine'])
+    assert registry.names() == ['acetone', 'pyridine']
+    assert registry.get('caffeine') is None
+    assert registry.mols_per_unit('acetone') == 0.8/58.08
+    assert registry.merge([dense_acetone, pyridine]) == ([], [], [])
+
+    # A journal entry with a known name is skipped, as when the library is read
+    assert registry.merge([dict(acetone, name='Acetone', density=0.5), caffeine], partial=True) == (['caffeine'], [], [])
+    assert registry.mols_per_unit('acetone') == 0.8/58.08
+
+def test_merge_duplicates(caffeine, acetone):
+    """Verifies that dropping a duplicate name also updates the columns of the batch conversions."""
+    registry = ReagentRegistry([acetone, dict(acetone, name='Acetone', density=0.5), caffeine])
+    model = CalculatorModel(registry)
+    model.to_mols_batch(['caffeine'], [1])
+    assert registry.merge([acetone, caffeine]) == ([], [], [])
+    assert model.to_mols_batch(['caffeine'], [1])[0] == model.to_mols('caffeine', 1)
+
+def test_watcher(tmp_path, caffeine, acetone, pyridine, write_library):
+    """Verifies that the watcher picks up journal additions and edits of library.json."""
+    path = str(tmp_path / 'library.json')
+    write_library(path, [caffeine])
+    registry = load_library(path)
+    watcher = LibraryWatcher(registry, path)
+    assert watcher.poll() == ([], [], [])
+
+    ReagentStore(path).append(acetone)
+    assert watcher.poll() == (['acetone'], [], [])
+    ReagentStore(path).append(pyridine)
+    changes = watcher.read()
+    assert registry.get('pyridine') is None  # Reading leaves the registry alone
+    assert watcher.apply(changes) == (['pyridine'], [], [])
+    assert watcher.read() is None
+
+    write_library(path, [acetone])
+    os.remove(path + '.journal')
+    assert watcher.poll() == ([], [], ['caffeine', 'pyridine'])
+    assert registry.names() == ['acetone']
+
+def test_start(tmp_path, caffeine, acetone, pyridine, write_library):
+    """Verifies that reagents appended while the library is read are picked up by the first poll."""
+    path = str(tmp_path / 'library.json')
+    write_library(path, [caffeine])
+
+    def load():
+        registry = load_library(path)
+        ReagentStore(path).append(acetone)
+        return registry
+
+    watcher = LibraryWatcher.start(path, load)
+    ReagentStore(path).append(pyridine)
+    assert watcher.poll() == (['acetone', 'pyridine'], [], [])
+
+def test_malformed_entry(tmp_path, monkeypatch, caffeine, acetone, write_library):
+    """Verifies that a malformed version of the library is read once and leaves the registry alone, and that the fixed file is picked up."""
+    path = str(tmp_path / 'library.json')
+    write_library(path, [caffeine])
+    registry = load_library(path)
+    watcher = LibraryWatcher(registry, path)
+
+    write_library(path, [caffeine, dict(acetone, name=5)])
+    with pytest.raises(ValueError):
+        watcher.poll()
+    assert registry.names() == ['caffeine']
+
+    reads = []
+    load = watcher.store.load
+    monkeypatch.setattr(watcher.store, 'load', lambda: reads.append(1) or load())
+    assert watcher.poll() == ([], [], [])
+    assert reads == []
+
+    write_library(path, [caffeine, acetone])
+    assert watcher.poll() == (['acetone'], [], [])
+    assert reads == [1]
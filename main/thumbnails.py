@@ -0,0 +1,143 @@
+"""Thumbnails of the reagent structure images.
+
+Rendered thumbnails are kept in a bounded in-memory LRU cache and in a persistent cache directory
+(~/.cache/eqs-calc/thumbnails by default, or $EQS_CALC_CACHE_DIR), keyed by image path, height and
+modification time, so a changed image is rendered again.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from PIL import Image
+from store import write_atomic
+
+DEFAULT_CACHE_DIR = os.environ.get('EQS_CALC_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'eqs-calc', 'thumbnails')
+
+def resize_image(image_path: str, new_height: int) -> Image.Image:
+    """Opens an image and resizes it to the given height, maintaining the aspect ratio."""
+
+    with Image.open(image_path) as original_image:
+        # Calculate the new width to maintain the aspect ratio
+        aspect_ratio = original_image.width / original_image.height
+        new_width = int(new_height * aspect_ratio)
+
+        # Resize the image
+        return original_image.resize((new_width, new_height))
+
+class ThumbnailCache:
+    """Two-level (memory and disk) cache of resized images, safe to use from several threads."""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_items: int = 128):
+        self.cache_dir = cache_dir
+        self.max_items = max_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._usage = self._load_usage()
+        self._usage_changed = False
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f'{digest}.png')
+
+    def get(self, image_path: str, height: int) -> Image.Image:
+        """Returns the thumbnail of an image. Raises OSError if the image cannot be read."""
+
+        image_path = os.path.abspath(image_path)
+        key = (image_path, height, os.stat(image_path).st_mtime_ns)
+
+        with self._lock:
+            thumbnail = self._memory.get(key)
+            if thumbnail is not None:
+                self._memory.move_to_end(key)
+                return thumbnail
+
+        thumbnail = self._read_disk(key)
+        if thumbnail is None:
+            thumbnail = resize_image(image_path, height)
+            self._write_disk(key, thumbnail)
+
+        with self._lock:
+            self._memory[key] = thumbnail
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+        return thumbnail
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with Image.open(self._disk_path(key)) as thumbnail:
+                thumbnail.load()
+                return thumbnail.copy()
+        except OSError:
+            return None
+
+    def _write_disk(self, key, thumbnail):
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            write_atomic(self._disk_path(key), lambda file: thumbnail.save(file, format='PNG'), binary=True)
+        except (OSError, ValueError):  # The disk cache is optional, e.g. on a read-only home directory
+            pass
+
+    def _usage_path(self):
+        return os.path.join(self.cache_dir, 'usage.json') if self.cache_dir else None
+
+    def _load_usage(self):
+        try:
+            with open(self._usage_path(), 'r', encoding='utf-8') as file:
+                usage = json.load(file)
+            return usage if isinstance(usage, dict) else {}
+        except (OSError, TypeError, ValueError):
+            return {}
+
+    def record_use(self, image_path: str):
+        """Counts a selection of the image, so that the most used images are prewarmed on the next start (see save_usage)."""
+
+        image_path = os.path.abspath(image_path)
+        with self._lock:
+            self._usage[image_path] = self._usage.get(image_path, 0) + 1
+            self._usage_changed = True
+
+    def save_usage(self):
+        """Writes the selection counts to the cache directory if they changed, e.g. when the app is closed."""
+
+        with self._lock:
+            if not self._usage_changed:
+                return
+            usage = dict(self._usage)
+            self._usage_changed = False
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            write_atomic(self._usage_path(), lambda file: json.dump(usage, file))
+        except OSError:
+            pass
+
+    def prewarm(self, image_paths, height: int, limit: int = 32) -> threading.Thread:
+        """Renders the thumbnails of the most used of the given images in a background thread.
+
+        Images that were never selected are taken in the given order. Returns the started thread.
+        """
+
+        image_paths = [os.path.abspath(path) for path in image_paths]
+        with self._lock:
+            usage = dict(self._usage)
+        order = {path: i for i, path in reversed(list(enumerate(image_paths)))}
+        selected = sorted(order, key=lambda path: (-usage.get(path, 0), order[path]))[:limit]
+
+        def run():
+            for path in selected:
+                try:
+                    self.get(path, height)
+                except OSError:
+                    pass
+
+        thread = threading.Thread(target=run, name='thumbnail-prewarm', daemon=True)
+        thread.start()
+        return thread
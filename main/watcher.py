@@ -0,0 +1,93 @@
+"""Hot reload of the reagent library.
+
+LibraryWatcher compares the size and modification time of library.json and its journal with the
+values seen on the previous poll, which costs two os.stat calls when nothing changed. If only the
+journal grew, just the appended lines are read. Otherwise the library is read again and merged into
+the registry, so that only the added, changed and removed reagents are touched. A version of the files
+with malformed entries is read once; it is read again only after the files change.
+"""
+
+from store import ReagentStore, file_signature
+
+# Errors of files that are read completely but hold malformed entries
+MALFORMED_ERRORS = (ValueError, KeyError, TypeError)
+
+def _check_entries(reagents: list):
+    for reagent in reagents:
+        if not isinstance(reagent, dict) or not isinstance(reagent.get('name'), str):
+            raise ValueError(f'Invalid library entry: {reagent!r}')
+
+class LibraryWatcher:
+    def __init__(self, registry, path: str):
+        self.registry = registry
+        self.store = ReagentStore(path)
+        self._library_signature = file_signature(self.store.path)
+        self._journal_signature = file_signature(self.store.journal_path)
+        self._journal_offset = self._journal_signature[0] if self._journal_signature else 0
+        self._malformed_signatures = None
+
+    @classmethod
+    def start(cls, path: str, load) -> 'LibraryWatcher':
+        """Reads the library with `load` (e.g. get_registry) and returns a watcher of the registry it returns.
+
+        The library files are looked at before they are read, so changes made during the read are picked
+        up by the first poll.
+        """
+
+        watcher = cls(None, path)
+        watcher.registry = load()
+        return watcher
+
+    def read(self):
+        """Reads the changes of the library files since the last poll, without touching the registry.
+
+        Only this step reads files, so it can run in a worker thread while the registry is in use.
+        Returns None if nothing changed (or the files are still the version that was found malformed),
+        otherwise the changes to pass to apply. Raises one of MALFORMED_ERRORS for malformed entries.
+        """
+
+        library_signature = file_signature(self.store.path)
+        journal_signature = file_signature(self.store.journal_path)
+        signatures = library_signature, journal_signature
+        if signatures in ((self._library_signature, self._journal_signature), self._malformed_signatures):
+            return None
+
+        try:
+            if library_signature == self._library_signature and journal_signature is not None and journal_signature[0] >= self._journal_offset:
+                # Reagents were only appended to the journal
+                reagents, journal_offset = self.store.read_journal_from(self._journal_offset)
+                partial = True
+            else:
+                reagents, partial = self.store.load(), False
+                journal_offset = journal_signature[0] if journal_signature else 0
+            _check_entries(reagents)
+        except MALFORMED_ERRORS:
+            self._malformed_signatures = signatures
+            raise
+        return reagents, partial, journal_offset, library_signature, journal_signature
+
+    def apply(self, changes) -> tuple:
+        """Merges the changes returned by read into the registry.
+
+        Returns
+        -------
+        tuple
+            Lists of the names of the added, changed and removed reagents (all empty if nothing changed).
+        """
+
+        if changes is None:
+            return [], [], []
+        reagents, partial, journal_offset, library_signature, journal_signature = changes
+        try:
+            result = self.registry.merge(reagents, partial=partial)
+        except MALFORMED_ERRORS:
+            self._malformed_signatures = library_signature, journal_signature
+            raise
+        self._journal_offset = journal_offset
+        self._library_signature = library_signature
+        self._journal_signature = journal_signature
+        return result
+
+    def poll(self) -> tuple:
+        """Applies changes of the library files to the registry. Returns the same as apply."""
+        return self.apply(self.read())